@@ -0,0 +1,93 @@
+"""add owner and foreign key indexes
+
+Revision ID: 93fbcb6ff9ab
+Revises: 4fad0580aa59
+Create Date: 2026-10-18 10:21:37.512903
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "93fbcb6ff9ab"
+down_revision = "4fad0580aa59"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep a single budget per owner and month before making it unique, the
+    # one with the highest amount set by the user
+    op.execute(
+        sa.text(
+            "DELETE FROM budget WHERE id IN ("
+            "SELECT id FROM ("
+            "SELECT id, row_number() OVER ("
+            "PARTITION BY owner_id, date ORDER BY budget DESC, id"
+            ") AS rank FROM budget"
+            ") AS ranked WHERE rank > 1"
+            ")"
+        )
+    )
+    # Receipts may have been counted in a deleted duplicate, recompute the
+    # recorded expense and surplus of the kept budgets from the receipts
+    op.execute(
+        sa.text(
+            "UPDATE budget SET recorded_expense = totals.total, "
+            "surplus = budget.budget - totals.total - budget.other_expense "
+            "FROM ("
+            "SELECT budget.id, COALESCE(SUM(receipt.amount), 0.0) AS total "
+            "FROM budget LEFT JOIN receipt "
+            "ON receipt.owner_id = budget.owner_id "
+            "AND receipt.date >= to_date(budget.date, 'YYYY-MM') "
+            "AND receipt.date < to_date(budget.date, 'YYYY-MM') + interval '1 month' "
+            "GROUP BY budget.id"
+            ") AS totals "
+            "WHERE budget.id = totals.id "
+            "AND abs(budget.recorded_expense - totals.total) > 0.001"
+        )
+    )
+
+    # CREATE INDEX CONCURRENTLY doesn't lock the tables for writes,
+    # but it can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_receipt_owner_id_date",
+            "receipt",
+            ["owner_id", "date"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_budget_owner_id_date",
+            "budget",
+            ["owner_id", "date"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_receipt_item_receipt_id",
+            "receipt_item",
+            ["receipt_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_offer_store_id", "offer", ["store_id"], postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_offer_category", "offer", ["category"], postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_offer_category", "offer", postgresql_concurrently=True)
+        op.drop_index("ix_offer_store_id", "offer", postgresql_concurrently=True)
+        op.drop_index(
+            "ix_receipt_item_receipt_id", "receipt_item", postgresql_concurrently=True
+        )
+        op.drop_index("ix_budget_owner_id_date", "budget", postgresql_concurrently=True)
+        op.drop_index(
+            "ix_receipt_owner_id_date", "receipt", postgresql_concurrently=True
+        )
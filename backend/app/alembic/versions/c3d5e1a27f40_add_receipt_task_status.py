@@ -0,0 +1,63 @@
+"""add receipt task status
+
+Revision ID: c3d5e1a27f40
+Revises: 93fbcb6ff9ab
+Create Date: 2026-10-18 11:02:15.204871
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "c3d5e1a27f40"
+down_revision = "93fbcb6ff9ab"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "receipt",
+        sa.Column(
+            "task_status", sqlmodel.sql.sqltypes.AutoString(length=50), nullable=True
+        ),
+    )
+    op.add_column(
+        "receipt",
+        sa.Column("task_message", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+    # Copy the status of the existing tasks, the result table is created by
+    # Celery on first use so it may not exist yet
+    if sa.inspect(op.get_bind()).has_table("celery_taskmeta"):
+        op.execute(
+            sa.text(
+                "UPDATE receipt SET task_status = celery_taskmeta.status, "
+                "task_message = celery_taskmeta.traceback "
+                "FROM celery_taskmeta WHERE celery_taskmeta.task_id = receipt.task_id"
+            )
+        )
+    op.execute(
+        sa.text(
+            "UPDATE receipt SET task_status = 'PENDING' "
+            "WHERE task_id IS NOT NULL AND task_status IS NULL"
+        )
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_receipt_task_id",
+            "receipt",
+            ["task_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_receipt_task_id", "receipt", postgresql_concurrently=True)
+    op.drop_column("receipt", "task_message")
+    op.drop_column("receipt", "task_status")
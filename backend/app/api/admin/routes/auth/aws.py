@@ -1,10 +1,10 @@
 from typing import Annotated
 from app.api.admin.service.aws_service import aws_service
-from app.api.deps import get_current_user
+from app.api.deps import get_async_current_user
 from app.common.response.response_schema import response_base
 from fastapi import APIRouter, Depends, Query, Response
 
-router = APIRouter(dependencies=[Depends(get_current_user)])
+router = APIRouter(dependencies=[Depends(get_async_current_user)])
 
 
 # To put images in S3 bucket
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.api.admin.model.user import User
+from app.core.config import settings
+from app.core.db_redis import redis_client, sync_redis_client
+from app.core.security import redis_token_authenticate
+from redis.exceptions import ConnectionError, TimeoutError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Replaces a user which was just written, a request which read the user before
+# the write can't cache it again while the marker is set
+INVALIDATED = "invalidated"
+INVALIDATED_EXPIRE_SECONDS = 10
+
+
+class UserCacheService:
+    """
+    Caches the users of the access tokens
+
+    Users are kept in an in-process LRU backed by Redis, without their hashed
+    password, which is read from the database when needed. Writes to a user
+    replace it in Redis by a short-lived marker, and publish its id so every
+    worker drops it from its LRU.
+    """
+
+    def __init__(self):
+        # LRU of the users by id, with their expiry time
+        self.users: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self.users_lock = threading.Lock()
+        # Users read while another one was invalidated are not kept in memory
+        self.invalidations = 0
+        self.channel = f"{settings.PROJECT_NAME}:user_cache"
+
+    def get_key(self, id: str) -> str:
+        return f"{settings.PROJECT_NAME}:user_cache:{id}"
+
+    def get_local_user(self, id: str) -> dict | None:
+        with self.users_lock:
+            cached_user = self.users.get(id)
+            if cached_user is None:
+                return None
+            if cached_user[1] < time.monotonic():
+                del self.users[id]
+                return None
+            self.users.move_to_end(id)
+            return cached_user[0]
+
+    def set_local_user(self, id: str, user_data: dict, invalidations: int):
+        expire_at = time.monotonic() + settings.USER_CACHE_EXPIRE_SECONDS
+        with self.users_lock:
+            if invalidations != self.invalidations:
+                return
+            self.users[id] = (user_data, expire_at)
+            self.users.move_to_end(id)
+            while len(self.users) > settings.USER_CACHE_SIZE:
+                self.users.popitem(last=False)
+
+    def drop_local_user(self, id: str | None = None):
+        with self.users_lock:
+            self.invalidations += 1
+            if id is None:
+                self.users.clear()
+            else:
+                self.users.pop(id, None)
+
+    async def get_cached_user(
+        self, id: str, token: str, invalidations: int
+    ) -> dict | None:
+        """
+        Check the token and get its user from the cache
+
+        A user cached in memory only needs the token check, a user cached in
+        Redis is read with the token in one round trip.
+
+        :param id:
+        :param token:
+        :param invalidations: the invalidation count before the lookup
+        :return: None if the user isn't cached
+        """
+        user_data = self.get_local_user(id)
+        if user_data is not None:
+            await redis_token_authenticate(id, token)
+            return user_data
+
+        (cached_user,) = await redis_token_authenticate(id, token, self.get_key(id))
+        if cached_user is None or cached_user == INVALIDATED:
+            return None
+        user_data = json.loads(cached_user)
+        self.set_local_user(id, user_data, invalidations)
+        return user_data
+
+    async def cache_user(self, id: str, user: User, invalidations: int):
+        user_data = user.model_dump(mode="json", exclude={"hashed_password"})
+        # Not stored while the user is marked as written
+        if await redis_client.set(
+            self.get_key(id),
+            json.dumps(user_data),
+            ex=settings.USER_CACHE_EXPIRE_SECONDS,
+            nx=True,
+        ):
+            self.set_local_user(id, user_data, invalidations)
+
+    async def authenticate(
+        self, session: AsyncSession, id: str, token: str
+    ) -> User | None:
+        """
+        Check the token and get its user, attached to the async session
+
+        :param session:
+        :param id:
+        :param token:
+        :return: None if the user doesn't exist
+        """
+        invalidations = self.invalidations
+        user_data = await self.get_cached_user(id, token, invalidations)
+        if user_data is not None:
+            # Attached to the session as if it was loaded, without a query
+            user = User.model_validate(user_data, update={"hashed_password": ""})
+            make_transient_to_detached(user)
+            user = await session.merge(user, load=False)
+            # The hashed password isn't cached, it is loaded on first access
+            session.expire(user, ["hashed_password"])
+            return user
+
+        user = await session.get(User, id)
+        if user is not None:
+            await self.cache_user(id, user, invalidations)
+        return user
+
+    def invalidate(self, id: uuid.UUID | str):
+        """
+        Call after committing a write to a user, drops it from all workers
+
+        :param id:
+        :return:
+        """
+        id = str(id)
+        self.drop_local_user(id)
+        pipe = sync_redis_client.pipeline(transaction=False)
+        pipe.set(self.get_key(id), INVALIDATED, ex=INVALIDATED_EXPIRE_SECONDS)
+        pipe.publish(self.channel, id)
+        pipe.execute()
+
+    async def listen_invalidations(self):
+        """
+        Run for the lifetime of the app, drops the users written by other workers
+
+        :return:
+        """
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Writes may have been missed while not subscribed
+                self.drop_local_user()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        self.drop_local_user(message["data"])
+            except (ConnectionError, TimeoutError) as e:
+                logger.warning(f"User cache invalidations interrupted: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+user_cache_service = UserCacheService()
@@ -5,6 +5,7 @@ from typing import Any
 import uuid
 
 from app.api.admin.crud.crud_user import user_dao
+from app.api.admin.service.user_cache_service import user_cache_service
 from app.api.admin.model.token import Message
 from app.api.admin.model.user import (
     UserRegister,
@@ -57,8 +58,7 @@ class UserService:
         return user_with_token
 
     async def logout(self, id: uuid.UUID) -> None:
-        prefix = f"{settings.PROJECT_NAME}:{id}:"
-        await redis_client.delete_prefix(prefix)
+        await security.revoke_tokens(id)
 
     # Return confirmation email with account info
     async def create_user(*, session: SessionDep, user_in: UserCreate) -> UserPublic:
@@ -189,6 +189,7 @@ class UserService:
         user.hashed_password = hashed_password
         session.add(user)
         session.commit()
+        user_cache_service.invalidate(user.id)
         return Message(message="Password updated successfully")
 
     def reset_password_html_content(*, session: SessionDep, email: str) -> Any:
@@ -251,6 +252,7 @@ class UserService:
         db_user = user_dao.update_user(
             session=session, db_user=db_user, user_in=user_in
         )
+        user_cache_service.invalidate(user_id)
         return db_user
 
     def delete_user(
@@ -268,6 +270,7 @@ class UserService:
         session.exec(statement)
         session.delete(user)
         session.commit()
+        user_cache_service.invalidate(user_id)
         return Message(message="User deleted successfully")
 
     # service about current user
@@ -285,12 +288,15 @@ class UserService:
         updated_user = user_dao.update_user_me(
             session=session, current_user=current_user, user_in=user_in
         )
+        user_cache_service.invalidate(current_user.id)
         user_info = UserPublic.model_validate(updated_user)
         return user_info
 
     async def update_password_me(
         self, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
     ) -> Message:
+        # The cached user has no hashed password, check the one in the database
+        session.refresh(current_user)
         if not verify_password(body.current_password, current_user.hashed_password):
             raise HTTPException(status_code=400, detail="Incorrect password")
         if body.current_password == body.new_password:
@@ -301,6 +307,7 @@ class UserService:
         user_dao.update_password_me(
             session=session, current_user=current_user, new_password=body.new_password
         )
+        user_cache_service.invalidate(current_user.id)
         await self.logout(id=current_user.id)
 
     def delete_user_me(*, session: SessionDep, current_user: CurrentUser) -> Message:
@@ -309,10 +316,12 @@ class UserService:
                 status_code=403,
                 detail="Super users are not allowed to delete themselves",
             )
-        statement = delete(Receipt).where(col(Receipt.owner_id) == current_user.id)
+        user_id = current_user.id
+        statement = delete(Receipt).where(col(Receipt.owner_id) == user_id)
         session.exec(statement)
         session.delete(current_user)
         session.commit()
+        user_cache_service.invalidate(user_id)
         return Message(message="User deleted successfully")
 
 
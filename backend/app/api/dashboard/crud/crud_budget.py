@@ -3,7 +3,11 @@ from typing import List
 import uuid
 
 from app.api.dashboard.model.budget import BudgetCreate, Budget, BudgetUpdate
-from sqlmodel import Session, select, delete
+from app.api.dashboard.model.receipt import Receipt
+from sqlalchemy import Float, String, column, literal, literal_column, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, func, select, delete, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
 
 
@@ -73,12 +77,17 @@ class BudgetDAO:
     def get_budget_by_date(
         self, session: Session, owner_id: uuid.UUID, date: str
     ) -> Budget:
-        budget = session.exec(
-            select(Budget).where(Budget.owner_id == owner_id, Budget.date == date)
-        ).first()
+        statement = self.get_budget_by_date_statement(owner_id=owner_id, date=date)
+        budget = session.exec(statement).first()
 
         return budget
 
+    def get_budget_by_date_statement(self, owner_id: uuid.UUID, date: str) -> Select:
+        statement = select(Budget).where(
+            Budget.owner_id == owner_id, Budget.date == date
+        )
+        return statement
+
     def update_budget(
         self, session: Session, current_budget: Budget, budget_in: BudgetUpdate
     ) -> Budget:
@@ -92,6 +101,147 @@ class BudgetDAO:
         session.refresh(current_budget)
         return current_budget
 
+    def update_recorded_expenses(
+        self, session: Session, owner_id: uuid.UUID, months: List[str]
+    ) -> None:
+        """
+        Refresh the recorded expense and the surplus of the budgets of the given
+        months from the receipts, missing budgets are created
+
+        :param months: months in YYYY-MM format
+        """
+        if not months:
+            return
+
+        first_days = [datetime.strptime(month, "%Y-%m") for month in months]
+        last_day = max(first_days)
+        start_date = min(first_days)
+        end_date = datetime(
+            last_day.year + last_day.month // 12, last_day.month % 12 + 1, 1
+        )
+
+        # Sum the receipts of all months at once, the literal keeps the
+        # grouped expression identical to the selected one
+        month_start = func.date_trunc(literal_column("'month'"), Receipt.date)
+        totals = (
+            select(
+                func.to_char(month_start, "YYYY-MM").label("date"),
+                func.sum(Receipt.amount).label("amount"),
+            )
+            .where(
+                Receipt.owner_id == owner_id,
+                Receipt.date >= start_date,
+                Receipt.date < end_date,
+            )
+            .group_by(month_start)
+            .subquery("totals")
+        )
+
+        # Months without receipts anymore are reset to zero
+        months_values = values(column("date", String), name="months").data(
+            [(month,) for month in set(months)]
+        )
+        expenses = (
+            select(
+                months_values.c.date,
+                func.coalesce(totals.c.amount, 0.0).label("amount"),
+            )
+            .select_from(
+                months_values.outerjoin(totals, totals.c.date == months_values.c.date)
+            )
+            .subquery("expenses")
+        )
+
+        # Existing budgets keep their amounts, only the expenses are replaced
+        statement = insert(Budget).from_select(
+            [
+                "id",
+                "owner_id",
+                "date",
+                "budget",
+                "other_expense",
+                "recorded_expense",
+                "surplus",
+            ],
+            select(
+                func.gen_random_uuid(),
+                literal(owner_id),
+                expenses.c.date,
+                0.0,
+                0.0,
+                expenses.c.amount,
+                0.0 - expenses.c.amount,
+            ),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[Budget.owner_id, Budget.date],
+            set_={
+                "recorded_expense": statement.excluded.recorded_expense,
+                "surplus": Budget.budget
+                - statement.excluded.recorded_expense
+                - Budget.other_expense,
+            },
+        )
+        session.exec(statement)
+        session.commit()
+
+    def add_recorded_expenses(
+        self, session: Session, owner_id: uuid.UUID, deltas: dict[str, float]
+    ) -> List[str]:
+        """
+        Add the amount deltas to the recorded expense of the budgets in place
+
+        :param deltas: amount delta of each month in YYYY-MM format
+        :return: the months without a budget, which are left unchanged
+        """
+        if not deltas:
+            return []
+
+        deltas_values = values(
+            column("date", String), column("amount", Float), name="deltas"
+        ).data(list(deltas.items()))
+        updated_months = session.exec(
+            update(Budget)
+            .where(Budget.owner_id == owner_id, Budget.date == deltas_values.c.date)
+            .values(
+                recorded_expense=Budget.recorded_expense + deltas_values.c.amount,
+                surplus=Budget.surplus - deltas_values.c.amount,
+            )
+            .returning(Budget.date)
+        ).scalars().all()
+        session.commit()
+
+        return list(set(deltas) - set(updated_months))
+
+    def reconcile_recorded_expenses(self, session: Session) -> int:
+        """
+        Recompute the recorded expense of every budget from the receipts and fix
+        the ones that drifted
+
+        :return: the number of fixed budgets
+        """
+        month_start = func.to_date(Budget.date, "YYYY-MM")
+        total = (
+            select(func.coalesce(func.sum(Receipt.amount), 0.0))
+            .where(
+                Receipt.owner_id == Budget.owner_id,
+                Receipt.date >= month_start,
+                Receipt.date < month_start + literal_column("interval '1 month'"),
+            )
+            .scalar_subquery()
+        )
+        fixed_budgets = session.exec(
+            update(Budget)
+            .where(func.abs(Budget.recorded_expense - total) > 0.001)
+            .values(
+                recorded_expense=total,
+                surplus=Budget.budget - total - Budget.other_expense,
+            )
+            .returning(Budget.id)
+        ).all()
+        session.commit()
+        return len(fixed_budgets)
+
     def delete_budgets(self, session: Session, ids: List[uuid.UUID]) -> bool:
         # Delete budget with items
         budgets = session.exec(select(Budget).where(Budget.id.in_(ids))).all()
@@ -106,4 +256,36 @@ class BudgetDAO:
         return True
 
 
+# Used by the async routes, builds its statements with BudgetDAO
+class AsyncBudgetDAO:
+    async def get_budget_list(
+        self,
+        session: AsyncSession,
+        owner_id: uuid.UUID,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        order_by: str | None = None,
+        order_type: str | None = None,
+    ) -> List[Budget]:
+        statement = budget_dao.get_budget_list_statement(
+            owner_id=owner_id,
+            start_date=start_date,
+            end_date=end_date,
+            order_by=order_by,
+            order_type=order_type,
+        )
+        budgets = (await session.exec(statement)).all()
+        return budgets
+
+    async def get_budget_by_date(
+        self, session: AsyncSession, owner_id: uuid.UUID, date: str
+    ) -> Budget:
+        statement = budget_dao.get_budget_by_date_statement(
+            owner_id=owner_id, date=date
+        )
+        budget = (await session.exec(statement)).first()
+        return budget
+
+
 budget_dao = BudgetDAO()
+async_budget_dao = AsyncBudgetDAO()
@@ -1,7 +1,9 @@
 from typing import List
 
 from app.api.dashboard.model.offer import Offer
+from sqlalchemy.orm import contains_eager
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
 
 
@@ -11,10 +13,12 @@ class OfferDAO:
         session: Session,
         description: str | None = None,
         category: str | None = None,
+        with_store: bool = False,
     ) -> List[Offer]:
         statement = self.get_offer_list_statement(
             description=description,
             category=category,
+            with_store=with_store,
         )
         offers = session.exec(statement).all()
         return offers
@@ -23,9 +27,14 @@ class OfferDAO:
         self,
         description: str | None = None,
         category: str | None = None,
+        with_store: bool = False,
     ) -> Select:
         statement = select(Offer)
 
+        # Load the store of each offer in the same query
+        if with_store:
+            statement = statement.join(Offer.store).options(contains_eager(Offer.store))
+
         if description and description != "":
             statement = statement.where(Offer.description == description)
 
@@ -35,4 +44,23 @@ class OfferDAO:
         return statement
 
 
+# Used by the async routes, builds its statements with OfferDAO
+class AsyncOfferDAO:
+    async def get_offer_list(
+        self,
+        session: AsyncSession,
+        description: str | None = None,
+        category: str | None = None,
+        with_store: bool = False,
+    ) -> List[Offer]:
+        statement = offer_dao.get_offer_list_statement(
+            description=description,
+            category=category,
+            with_store=with_store,
+        )
+        offers = (await session.exec(statement)).all()
+        return offers
+
+
 offer_dao = OfferDAO()
+async_offer_dao = AsyncOfferDAO()
@@ -9,7 +9,9 @@ from app.api.dashboard.model.receipt import (
     ReceiptUpdate,
     ReceiptItem,
 )
-from sqlmodel import Session, select, delete
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select, delete, insert, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import Select
 
 
@@ -24,17 +26,35 @@ class ReceiptDAO:
         return db_item
 
     def create_receipts(
-        self, session: Session, receipts: List[ReceiptCreate], owner_id: uuid.UUID
+        self,
+        session: Session,
+        receipts: List[ReceiptCreate],
+        owner_id: uuid.UUID,
+        task_ids: List[str | None] | None = None,
+        task_status: str | None = None,
     ) -> List[Receipt]:
-        # Can generate id for each receipt automatically
+        # Insert the receipts and their items with multi-row INSERTs in one
+        # transaction, the ids are generated here so nothing is read back
         receipts_db = []
-        for receipt in receipts:
-            db_item = Receipt.model_validate(receipt, update={"owner_id": owner_id})
-            session.add(db_item)
+        receipt_rows = []
+        item_rows = []
+        for index, receipt in enumerate(receipts):
+            db_item = Receipt(
+                **receipt.model_dump(exclude={"items"}),
+                owner_id=owner_id,
+                task_id=task_ids[index] if task_ids else None,
+                task_status=task_status,
+            )
             receipts_db.append(db_item)
+            receipt_rows.append(db_item.model_dump())
+            for item in receipt.items:
+                item_rows.append({**item.model_dump(), "receipt_id": db_item.id})
+
+        if receipt_rows:
+            session.exec(insert(Receipt), params=receipt_rows)
+        if item_rows:
+            session.exec(insert(ReceiptItem), params=item_rows)
         session.commit()
-        for receipt in receipts_db:
-            session.refresh(receipt)
         return receipts_db
 
     def get_receipt_list(
@@ -47,6 +67,7 @@ class ReceiptDAO:
         end_date: datetime | None = None,
         order_by: str | None = None,
         order_type: str | None = None,
+        task_status: str | None = None,
     ) -> List[Receipt]:
         statement = self.get_receipt_list_statement(
             owner_id=owner_id,
@@ -54,6 +75,7 @@ class ReceiptDAO:
             category=category,
             start_date=start_date,
             end_date=end_date,
+            task_status=task_status,
             order_by=order_by,
             order_type=order_type,
         )
@@ -69,6 +91,7 @@ class ReceiptDAO:
         end_date: datetime | None = None,
         order_by: str | None = None,
         order_type: str | None = None,
+        task_status: str | None = None,
     ) -> Select:
         statement = select(Receipt).where(Receipt.owner_id == owner_id)
 
@@ -86,13 +109,18 @@ class ReceiptDAO:
         if end_date and end_date != "":
             statement = statement.where(Receipt.date <= end_date)
 
+        if task_status and task_status != "":
+            statement = statement.where(Receipt.task_status == task_status)
+
+        # The id breaks ties, so the order is stable across pages
         if order_by and order_by != "":
             order_column = getattr(Receipt, order_by)
-            statement = statement.order_by(
-                order_column.desc() if order_type == "desc" else order_column
-            )
+            if order_type == "desc":
+                statement = statement.order_by(order_column.desc(), Receipt.id.desc())
+            else:
+                statement = statement.order_by(order_column, Receipt.id)
         else:
-            statement = statement.order_by(Receipt.date.desc())
+            statement = statement.order_by(Receipt.date.desc(), Receipt.id.desc())
 
         return statement
 
@@ -106,6 +134,16 @@ class ReceiptDAO:
         receipts = session.exec(select(Receipt).where(Receipt.id.in_(ids))).all()
         return receipts
 
+    def get_receipts_by_task_ids(
+        self, session: Session, owner_id: uuid.UUID, task_ids: List[str]
+    ) -> List[Receipt]:
+        receipts = session.exec(
+            select(Receipt).where(
+                Receipt.owner_id == owner_id, Receipt.task_id.in_(task_ids)
+            )
+        ).all()
+        return receipts
+
     def update_receipt(
         self, session: Session, current_receipt: Receipt, receipt_in: ReceiptUpdate
     ) -> Receipt:
@@ -134,6 +172,41 @@ class ReceiptDAO:
         session.refresh(current_receipt)
         return current_receipt
 
+    def update_receipts(
+        self,
+        session: Session,
+        current_receipts: List[Receipt],
+        receipts_in: List[ReceiptUpdate],
+    ) -> List[Receipt]:
+        # Update the receipts in one transaction, the items of all receipts
+        # are replaced with one DELETE and one multi-row INSERT
+        receipts_by_id = {receipt.id: receipt for receipt in current_receipts}
+        replaced_ids = []
+        item_rows = []
+        for receipt_in in receipts_in:
+            current_receipt = receipts_by_id[receipt_in.id]
+            update_dict = receipt_in.model_dump(exclude_unset=True)
+            for key, value in update_dict.items():
+                if key != "items":
+                    setattr(current_receipt, key, value)
+            session.add(current_receipt)
+
+            if "items" in update_dict:
+                replaced_ids.append(current_receipt.id)
+                for item in receipt_in.items:
+                    item_rows.append(
+                        {**item.model_dump(), "receipt_id": current_receipt.id}
+                    )
+
+        if replaced_ids:
+            session.exec(
+                delete(ReceiptItem).where(ReceiptItem.receipt_id.in_(replaced_ids))
+            )
+        if item_rows:
+            session.exec(insert(ReceiptItem), params=item_rows)
+        session.commit()
+        return current_receipts
+
     def delete_receipts(self, session: Session, receipts: List[Receipt]) -> None:
         for receipt in receipts:
             session.delete(receipt)
@@ -155,17 +228,29 @@ class ReceiptDAO:
             session.add(db_item)
         session.commit()
 
-    def update_receipt_tasks_status(
+    def update_receipts_task_status(
         self,
         session: Session,
-        receipts: List[Receipt],
-        task_id: str | None = None,
+        task_id: str,
+        task_status: str,
+        task_message: str | None = None,
     ) -> None:
-        for receipt in receipts:
-            if task_id:
-                receipt.task_id = task_id
-            session.add(receipt)
+        # All receipts extracted from a file share the task of the file
+        session.exec(
+            update(Receipt)
+            .where(Receipt.task_id == task_id)
+            .values(task_status=task_status, task_message=task_message)
+        )
         session.commit()
 
 
+# Used by the async routes, builds its statements with ReceiptDAO
+class AsyncReceiptDAO:
+    async def get_receipt_by_id(self, session: AsyncSession, id: uuid.UUID) -> Receipt:
+        # Relationships can't be lazy loaded with an async session
+        receipt = await session.get(Receipt, id, options=[selectinload(Receipt.items)])
+        return receipt
+
+
 receipt_dao = ReceiptDAO()
+async_receipt_dao = AsyncReceiptDAO()
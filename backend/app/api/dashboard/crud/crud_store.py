@@ -28,7 +28,7 @@ class StoreDAO:
         session: Session,
         ids: List[uuid.UUID] | None = None,
     ) -> List[Store]:
-        store = session.exec(select(Store).where(Store.id in ids)).all()
+        store = session.exec(select(Store).where(Store.id.in_(ids))).all()
         return store
 
 
@@ -3,7 +3,7 @@ from typing import List, TYPE_CHECKING, Optional
 
 from app.common.model import AliasMixin
 from pydantic import field_validator
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Field, Index, Relationship, SQLModel
 import uuid
 import re
 
@@ -35,6 +35,10 @@ class BudgetDelete(SQLModel):
 # Database model, database table inferred from class name
 class Budget(BudgetBase, table=True):
     __tablename__ = "budget"
+    # One budget per owner and month
+    __table_args__ = (
+        Index("ix_budget_owner_id_date", "owner_id", "date", unique=True),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     date: str = Field()
@@ -10,7 +10,7 @@ if TYPE_CHECKING:
 
 
 class OfferBase(AliasMixin, TimeStampMixin):
-    category: str = Field(max_length=50)
+    category: str = Field(max_length=50, index=True)
     start_date: datetime = Field(default_factory=datetime.utcnow)
     end_date: datetime = Field(default_factory=datetime.utcnow)
     item: str = Field(max_length=50)
@@ -31,7 +31,7 @@ class Offer(OfferBase, table=True):
     __tablename__ = "offer"
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    store_id: uuid.UUID = Field(foreign_key="store.id", ondelete="CASCADE")
+    store_id: uuid.UUID = Field(foreign_key="store.id", ondelete="CASCADE", index=True)
     store: "Store" = Relationship(back_populates="offers")
 
 
@@ -43,6 +43,11 @@ class OfferPublic(OfferBase):
     img_url: str | None = None
 
 
+# A line of a recommended shopping list
+class OfferInRecommendation(OfferPublic):
+    purchase_quantity: int
+
+
 class OfferInShoppingList(OfferPublic):
     price_string: str
     offer_info: str
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List, TYPE_CHECKING, Optional
 
 from app.common.model import AliasMixin
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Field, Index, Relationship, SQLModel
 import uuid
 
 if TYPE_CHECKING:
@@ -45,6 +45,8 @@ class ReceiptFileCreate(AliasMixin):
 # Database model, database table inferred from class name
 class Receipt(ReceiptBase, table=True):
     __tablename__ = "receipt"
+    # Receipts are always listed per owner, filtered and sorted by date
+    __table_args__ = (Index("ix_receipt_owner_id_date", "owner_id", "date"),)
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     owner_id: uuid.UUID = Field(foreign_key="user.id")
@@ -52,7 +54,10 @@ class Receipt(ReceiptBase, table=True):
     items: List["ReceiptItem"] = Relationship(
         back_populates="receipt", cascade_delete=True
     )
-    task_id: Optional[str] = Field(default=None, nullable=True)
+    task_id: Optional[str] = Field(default=None, nullable=True, index=True)
+    # Maintained by the signals of the upload task, see celery_task/receipt
+    task_status: Optional[str] = Field(default=None, max_length=50, nullable=True)
+    task_message: Optional[str] = Field(default=None, nullable=True)
 
 
 # Properties to return via API, id is always required
@@ -82,5 +87,7 @@ class ReceiptItem(ReceiptItemBase, table=True):
     __tablename__ = "receipt_item"
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    receipt_id: uuid.UUID = Field(foreign_key="receipt.id", ondelete="CASCADE")
+    receipt_id: uuid.UUID = Field(
+        foreign_key="receipt.id", ondelete="CASCADE", index=True
+    )
     receipt: "Receipt" = Relationship(back_populates="items")
@@ -9,7 +9,7 @@ from app.api.dashboard.model.budget import (
     BudgetDelete,
 )
 from app.api.dashboard.service.budget_service import budget_service
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import AsyncSessionDep, AsyncCurrentUser, CurrentUser, SessionDep
 from app.common.response.response_schema import ResponseModel
 from app.common.response.response_schema import response_base
 from fastapi import APIRouter, Query
@@ -22,8 +22,8 @@ router = APIRouter()
 
 @router.get("/list")
 async def get_budgets_list(
-    session: SessionDep,
-    current_user: CurrentUser,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
     start_date: Annotated[str | None, Query(alias="startDate")] = None,
     end_date: Annotated[str | None, Query(alias="endDate")] = None,
     order_by: Annotated[str | None, Query(alias="orderBy")] = None,
@@ -37,12 +37,14 @@ async def get_budgets_list(
         order_by=order_by,
         order_type=order_type,
     )
-    return paginate(session, statement)
+    return await paginate(session, statement)
 
 
 @router.get("/current")
-async def get_budget(session: SessionDep, current_user: CurrentUser) -> ResponseModel:
-    budget = budget_service.get_current_budget(
+async def get_budget(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser
+) -> ResponseModel:
+    budget = await budget_service.get_current_budget(
         session=session, current_user=current_user
     )
     return await response_base.success(data=budget)
@@ -86,9 +88,9 @@ async def delete_budgets(
 
 @router.get("/overview")
 async def get_budgets_overview(
-    session: SessionDep, current_user: CurrentUser
+    session: AsyncSessionDep, current_user: AsyncCurrentUser
 ) -> ResponseModel:
-    overview = budget_service.get_budgets_overview(
+    overview = await budget_service.get_budgets_overview(
         session=session, current_user=current_user
     )
     return await response_base.success(data=overview)
@@ -1,44 +1,52 @@
 from typing import Annotated
 from app.api.dashboard.model.offer import (
-    Offer,
     OfferPublic,
     ShoppingListContent,
 )
+from app.api.dashboard.service.catalog_service import catalog_service
 from app.api.dashboard.service.offer_service import offer_service
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import (
+    AsyncSessionDep,
+    AsyncCurrentUser,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+)
 from app.common.response.response_schema import ResponseModel, response_base
 from fastapi import APIRouter, Depends, Query
-from fastapi_pagination import Page, Params
-from fastapi_pagination.ext.sqlmodel import paginate
+from fastapi_pagination import Page, Params, paginate
 
 router = APIRouter()
 
 
 @router.get("/list")
 async def get_offers_list(
-    session: SessionDep,
+    session: AsyncSessionDep,
     description: str | None = None,
     category: str | None = None,
     params: Params = Depends(),
 ) -> Page[OfferPublic]:
-    statement = offer_service.get_offer_list_statement(
+    offers = await offer_service.get_offer_list(
+        session=session,
         description=description,
         category=category,
     )
 
-    paginated_offers = paginate(session, statement)
-
-    store_dict = {}
+    # The offers are already in memory, not a query for the sqlmodel extension
+    paginated_offers = paginate(offers, safe=True)
+    return paginated_offers
 
-    for offer in paginated_offers.items:
-        if offer.store_id in store_dict:
-            offer.store_name = store_dict[offer.store_id]
-        else:
-            offer = offer_service.update_offer_store_name(session=session, offer=offer)
-            store_dict[offer.store_id] = offer.store_name
 
-        offer = offer_service.update_offer_img_url(offer)
-    return paginated_offers
+@router.post(
+    "/catalog/refresh",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def refresh_offer_catalog() -> ResponseModel:
+    """
+    Reload the offer catalog of all workers, call after writing offers
+    """
+    version = await catalog_service.bump_version()
+    return await response_base.success(data={"version": version})
 
 
 @router.post("/send-shopping-list-email")
@@ -53,11 +61,11 @@ async def send_shopping_list_email(
 
 @router.get("/recommend-shopping-list")
 async def recommend_shopping_list(
-    session: SessionDep,
-    current_user: CurrentUser,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
     weekly_budget: Annotated[str | None, Query(alias="weeklyBudget")] = None,
 ) -> ResponseModel:
-    recommended_shopping_list = offer_service.recommend_shopping_list(
+    recommended_shopping_list = await offer_service.recommend_shopping_list(
         session=session, current_user=current_user, weekly_budget=weekly_budget
     )
     return await response_base.success(data={"items": recommended_shopping_list})
@@ -1,4 +1,4 @@
-from typing import Any, Annotated
+from typing import Any, Annotated, Literal
 import uuid
 
 from app.api.admin.model.token import Message
@@ -9,7 +9,8 @@ from app.api.dashboard.model.receipt import (
     ReceiptDelete,
 )
 from app.api.dashboard.service.receipt_service import receipt_service
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import AsyncSessionDep, AsyncCurrentUser, CurrentUser, SessionDep
+from app.common.pagination import CursorPage
 from app.common.response.response_schema import ResponseModel
 from app.common.response.response_schema import response_base
 from fastapi import APIRouter, Query
@@ -22,14 +23,15 @@ router = APIRouter()
 
 @router.get("/list")
 async def get_receipts_list(
-    session: SessionDep,
-    current_user: CurrentUser,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
     description: str | None = None,
     category: str | None = None,
     start_date: Annotated[datetime | None, Query(alias="startDate")] = None,
     end_date: Annotated[datetime | None, Query(alias="endDate")] = None,
     order_by: Annotated[str | None, Query(alias="orderBy")] = None,
     order_type: Annotated[str | None, Query(alias="orderType")] = None,
+    task_status: Annotated[str | None, Query(alias="taskStatus")] = None,
 ) -> Page[ReceiptPublic]:
     statement = receipt_service.get_receipt_list_statement(
         session=session,
@@ -40,30 +42,49 @@ async def get_receipts_list(
         end_date=end_date,
         order_by=order_by,
         order_type=order_type,
+        task_status=task_status,
     )
-    paginated_receipts = paginate(session, statement)
+    paginated_receipts = await paginate(session, statement)
 
-    receipt_task_dict = {}
+    return paginated_receipts
 
-    for receipt in paginated_receipts.items:
-        if hasattr(receipt, "task_id") and receipt.task_id not in receipt_task_dict:
-            receipt = receipt_service.update_receipt_task_status(receipt)
-            receipt_task_dict[receipt.task_id] = {
-                "status": receipt.task_status,
-                "message": receipt.task_message,
-            }
-        else:
-            receipt.task_status = receipt_task_dict[receipt.task_id]["status"]
-            receipt.task_message = receipt_task_dict[receipt.task_id]["message"]
+
+@router.get("/list/cursor")
+async def get_receipts_cursor_list(
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    description: str | None = None,
+    category: str | None = None,
+    start_date: Annotated[datetime | None, Query(alias="startDate")] = None,
+    end_date: Annotated[datetime | None, Query(alias="endDate")] = None,
+    # Keyset pagination needs non-null ordering columns
+    order_by: Annotated[
+        Literal["date", "amount", "description"] | None, Query(alias="orderBy")
+    ] = None,
+    order_type: Annotated[str | None, Query(alias="orderType")] = None,
+    task_status: Annotated[str | None, Query(alias="taskStatus")] = None,
+) -> CursorPage[ReceiptPublic]:
+    statement = receipt_service.get_receipt_list_statement(
+        session=session,
+        current_user=current_user,
+        description=description,
+        category=category,
+        start_date=start_date,
+        end_date=end_date,
+        order_by=order_by,
+        order_type=order_type,
+        task_status=task_status,
+    )
+    paginated_receipts = await paginate(session, statement)
 
     return paginated_receipts
 
 
 @router.get("/receipt/{id}")
 async def get_receipt(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, id: uuid.UUID
 ) -> ResponseModel:
-    receipt = receipt_service.get_receipt(session=session, id=id)
+    receipt = await receipt_service.get_receipt(session=session, id=id)
     return await response_base.success(data=receipt)
 
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 import uuid
 
-from app.api.dashboard.crud.crud_budget import budget_dao
+from app.api.dashboard.crud.crud_budget import async_budget_dao, budget_dao
 from app.api.dashboard.model.budget import (
     Budget,
     BudgetDetail,
@@ -10,7 +10,7 @@ from app.api.dashboard.model.budget import (
     BudgetUpdate,
     BudgetDelete,
 )
-from app.api.deps import SessionDep, CurrentUser
+from app.api.deps import AsyncSessionDep, AsyncCurrentUser, SessionDep, CurrentUser
 from fastapi import HTTPException
 from sqlmodel.sql.expression import Select
 
@@ -37,8 +37,8 @@ class BudgetService:
 
     def get_budget_list_statement(
         self,
-        session: SessionDep,
-        current_user: CurrentUser,
+        session: AsyncSessionDep,
+        current_user: AsyncCurrentUser,
         start_date: str | None = None,
         end_date: str | None = None,
         order_by: str | None = None,
@@ -53,14 +53,14 @@ class BudgetService:
         )
         return statement
 
-    def get_current_budget(
-        self, session: SessionDep, current_user: CurrentUser
+    async def get_current_budget(
+        self, session: AsyncSessionDep, current_user: AsyncCurrentUser
     ) -> Budget:
         current = datetime.now()
         # Change to YYYY-MM format
         current_date = f"{current.year}-{current.month:02d}"
 
-        budget = budget_dao.get_budget_by_date(
+        budget = await async_budget_dao.get_budget_by_date(
             session=session, owner_id=current_user.id, date=current_date
         )
 
@@ -69,31 +69,6 @@ class BudgetService:
 
         return budget
 
-    def create_budget_from_receipts(
-        self, session: SessionDep, current_user: CurrentUser, date: str, amount: float
-    ) -> Budget:
-        budgets = budget_service.get_budget_list(
-            session=session,
-            current_user=current_user,
-            start_date=date,
-            end_date=date,
-        )
-
-        if len(budgets) > 0:
-            budgets[0].recorded_expense = amount
-            budgets[0].surplus = budgets[0].budget - amount - budgets[0].other_expense
-            session.add(budgets[0])
-            session.commit()
-        else:
-            budget_in = BudgetCreate(
-                date=date,
-                recorded_expense=amount,
-            )
-
-            budget_service.create_budget(
-                session=session, current_user=current_user, budget_in=budget_in
-            )
-
     def create_budget(
         self, session: SessionDep, current_user: CurrentUser, budget_in: BudgetCreate
     ) -> Budget:
@@ -136,13 +111,13 @@ class BudgetService:
         if not result:
             raise HTTPException(status_code=404, detail="Budgets not found")
 
-    def get_budgets_overview(
-        self, session: SessionDep, current_user: CurrentUser
+    async def get_budgets_overview(
+        self, session: AsyncSessionDep, current_user: AsyncCurrentUser
     ) -> list[BudgetOverview]:
         current = datetime.now()
         start_date = f"{current.year-1}-01"
         end_date = f"{current.year}-12"
-        budgets = budget_dao.get_budget_list(
+        budgets = await async_budget_dao.get_budget_list(
             session=session,
             owner_id=current_user.id,
             start_date=start_date,
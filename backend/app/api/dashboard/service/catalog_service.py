@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.api.dashboard.crud.crud_offer import async_offer_dao
+from app.api.dashboard.model.offer import Offer, OfferPublic
+from app.core.cloudfront import cloudfront_client
+from app.core.config import settings
+from app.core.db_redis import redis_client
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import ConnectionError, TimeoutError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    The offers with their store names and image URLs, indexed by id and category
+    """
+
+    def __init__(
+        self,
+        version: int,
+        offers: list[OfferPublic],
+        urls_expire_at: datetime | None = None,
+    ):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # Earliest expiry of the signed image URLs
+        self.urls_expire_at = urls_expire_at
+        self.offers = offers
+        self.offers_by_id: dict[uuid.UUID, OfferPublic] = {}
+        self.offers_by_category: dict[str, list[OfferPublic]] = defaultdict(list)
+        for offer in offers:
+            self.offers_by_id[offer.id] = offer
+            self.offers_by_category[offer.category].append(offer)
+
+
+class CatalogService:
+    """
+    Keeps the offer catalog in memory
+
+    The catalog version is stored in Redis and bumped on every offer change,
+    the workers are notified through pub/sub and drop their snapshot, which is
+    reloaded on the next read. Snapshots are also reloaded once they are older
+    than OFFER_CATALOG_MAX_AGE_SECONDS, or once one of their signed image URLs
+    has less than CLOUDFRONT_URL_CACHE_MARGIN_SECONDS left.
+    """
+
+    def __init__(self):
+        self.snapshot: CatalogSnapshot | None = None
+        self.snapshot_lock = asyncio.Lock()
+        self.version_key = f"{settings.PROJECT_NAME}:offer_catalog:version"
+        self.channel = f"{settings.PROJECT_NAME}:offer_catalog"
+
+    def is_fresh(self, snapshot: CatalogSnapshot | None) -> bool:
+        if snapshot is None:
+            return False
+        if (
+            time.monotonic() - snapshot.loaded_at
+            >= settings.OFFER_CATALOG_MAX_AGE_SECONDS
+        ):
+            return False
+        # Image URLs reused from the URL cache may expire before the max age
+        margin = timedelta(seconds=settings.CLOUDFRONT_URL_CACHE_MARGIN_SECONDS)
+        return (
+            snapshot.urls_expire_at is None
+            or snapshot.urls_expire_at - datetime.now() > margin
+        )
+
+    async def get_version(self) -> int:
+        return int(await redis_client.get(self.version_key) or 0)
+
+    async def get_snapshot(self, session: AsyncSession) -> CatalogSnapshot:
+        snapshot = self.snapshot
+        if self.is_fresh(snapshot):
+            return snapshot
+
+        # A single request reloads the catalog, the others wait for it
+        async with self.snapshot_lock:
+            snapshot = self.snapshot
+            if not self.is_fresh(snapshot):
+                snapshot = await self.load_snapshot(session)
+                # Offers written during the load may be missing from it, it is
+                # then only used by this request. There is no await between the
+                # check and the assignment, later bumps invalidate it
+                if await self.get_version() == snapshot.version:
+                    self.snapshot = snapshot
+        return snapshot
+
+    async def load_snapshot(self, session: AsyncSession) -> CatalogSnapshot:
+        # Read the version first, it is read again once loaded
+        version = await self.get_version()
+        offers = await async_offer_dao.get_offer_list(session=session, with_store=True)
+        # Signing the image URLs is CPU bound
+        offers_public, urls_expire_at = await run_in_threadpool(
+            self.get_offers_public, offers
+        )
+
+        logger.info(f"Loaded offer catalog version {version}: {len(offers)} offers")
+        return CatalogSnapshot(
+            version=version, offers=offers_public, urls_expire_at=urls_expire_at
+        )
+
+    def get_offers_public(
+        self, offers: list[Offer]
+    ) -> tuple[list[OfferPublic], datetime | None]:
+        offers_public = []
+        urls_expire_at = None
+        for offer in offers:
+            offer_public = OfferPublic.model_validate(
+                offer, update={"store_name": offer.store.name}
+            )
+            if offer_public.img:
+                img_url, expire_at = cloudfront_client.get_file_url_with_expiry(
+                    offer_public.img
+                )
+                offer_public.img_url = img_url
+                if expire_at is not None and (
+                    urls_expire_at is None or expire_at < urls_expire_at
+                ):
+                    urls_expire_at = expire_at
+            offers_public.append(offer_public)
+        return offers_public, urls_expire_at
+
+    def invalidate(self, version: int | None = None):
+        """
+        Drop the snapshot, unless it is already at the given version
+
+        :param version:
+        :return:
+        """
+        snapshot = self.snapshot
+        if snapshot is not None and (version is None or snapshot.version < version):
+            self.snapshot = None
+
+    async def bump_version(self) -> int:
+        """
+        Call after writing offers, invalidates the snapshots of all workers
+
+        :return:
+        """
+        version = await redis_client.incr(self.version_key)
+        await redis_client.publish(self.channel, version)
+        self.invalidate(version)
+        return version
+
+    async def listen_invalidations(self):
+        """
+        Run for the lifetime of the app, drops the snapshot on version bumps
+
+        :return:
+        """
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Bumps may have been missed while not subscribed
+                self.invalidate()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        self.invalidate(int(message["data"]))
+            except (ConnectionError, TimeoutError) as e:
+                logger.warning(f"Offer catalog invalidations interrupted: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+catalog_service = CatalogService()
@@ -1,57 +1,70 @@
+import asyncio
+from contextlib import suppress
 from datetime import datetime
 import json
+import logging
+import math
+from typing import Callable
 import uuid
 
-from app.api.dashboard.crud.crud_offer import offer_dao
 from app.api.dashboard.model.offer import (
-    Offer,
+    OfferInRecommendation,
     OfferPublic,
     ShoppingListContent,
 )
-from app.core.cloudfront import cloudfront_client
-from app.api.deps import CurrentUser, SessionDep
-from app.api.dashboard.service.store_service import store_service
+from app.api.dashboard.service.catalog_service import catalog_service
+from app.api.deps import AsyncSessionDep, AsyncCurrentUser, CurrentUser, SessionDep
+from app.core.config import settings
+from app.core.db_redis import redis_client
+from app.utils.shopping_list import (
+    encode_prompt_offers,
+    select_prompt_offers,
+    solve_shopping_list,
+)
 from app.utils.utils import generate_shopping_list_email, send_email
 from fastapi import HTTPException
-from sqlmodel.sql.expression import Select
+from fastapi.concurrency import run_in_threadpool
+from redis.exceptions import LockError
 from app.core.openai import openai_client
 
+logger = logging.getLogger(__name__)
+
 
 class OfferService:
-    def get_offer_list(
-        self,
-        session: SessionDep,
-        description: str | None = None,
-        category: str | None = None,
-    ) -> list[Offer]:
-        offers = offer_dao.get_offer_list(
-            session=session,
-            description=description,
-            category=category,
-        )
-        return offers
+    def __init__(self):
+        # Shopping list selections being generated, by cache key
+        self.pending_selections: dict[str, asyncio.Future] = {}
 
-    def get_offer_list_statement(
+    async def get_offer_list(
         self,
+        session: AsyncSessionDep,
         description: str | None = None,
         category: str | None = None,
-    ) -> Select:
-        statement = offer_dao.get_offer_list_statement(
-            description=description,
-            category=category,
-        )
-        return statement
+    ) -> list[OfferPublic]:
+        # Served from the in-memory catalog, the offers must not be modified
+        snapshot = await catalog_service.get_snapshot(session)
+        if category and category != "":
+            offers = snapshot.offers_by_category.get(category, [])
+        else:
+            offers = snapshot.offers
 
-    def update_offer_store_name(self, session: SessionDep, offer: OfferPublic):
-        if offer.store_id:
-            store = store_service.get_store_by_id(session=session, id=offer.store_id)
-            offer.store_name = store.name
-        return offer
+        if description and description != "":
+            description = description.lower()
+            offers = [
+                offer
+                for offer in offers
+                if any(
+                    item and description in item.lower()
+                    for item in (
+                        offer.item,
+                        offer.item_en,
+                        offer.item_sv,
+                        offer.item_zh,
+                    )
+                )
+            ]
 
-    def update_offer_img_url(self, offer: OfferPublic):
-        if offer.img:
-            offer.img_url = cloudfront_client.generate_url(offer.img)
-        return offer
+        return offers
 
     async def send_shopping_list_email(
         self,
@@ -69,57 +82,196 @@ class OfferService:
             html_content=email_data.html_content,
         )
 
-    def recommend_shopping_list(
+    async def recommend_shopping_list(
         self,
-        session: SessionDep,
-        current_user: CurrentUser,
+        session: AsyncSessionDep,
+        current_user: AsyncCurrentUser,
         weekly_budget: str,
-    ):
+    ) -> list[OfferInRecommendation]:
+        budget = self.get_budget_bucket(weekly_budget)
+        snapshot = await catalog_service.get_snapshot(session)
+        cache_key = self.get_shopping_list_cache_key(snapshot.version, budget)
+
+        def generate_selection() -> list[tuple[str, int]]:
+            if settings.SHOPPING_LIST_SOLVER == "llm":
+                selected_offers = self.generate_shopping_list(
+                    snapshot.offers, f"{budget:g}"
+                )
+                if selected_offers is None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Unable to generate shopping list recommendation",
+                    )
+            else:
+                selected_offers = self.solve_shopping_list(snapshot.offers, budget)
+            return [(str(offer.id), quantity) for offer, quantity in selected_offers]
+
+        selection = await self.get_shopping_list_selection(
+            cache_key, generate_selection
+        )
+
+        # One line per offer, the offers of the catalog are already signed
+        quantities: dict[str, int] = {}
+        for offer_id, quantity in selection:
+            quantities[offer_id] = quantities.get(offer_id, 0) + quantity
+
         shopping_list = []
-        offers = self.get_offer_list(session=session)
-        offer_info = []
-        for offer in offers:
-            offer_info.append(
-                {
-                    "id": str(offer.id),
-                    "name": offer.item_en,
-                    "price": offer.price,
-                    "unit_range_from": offer.unit_range_from,
-                    "unit_range_to": offer.unit_range_to,
-                    "unit": offer.unit,
-                    "ordinary_price": offer.ordinary_price,
-                    "store_name": offer.store.name,
-                }
+        for offer_id, quantity in quantities.items():
+            selected_offer = snapshot.offers_by_id.get(uuid.UUID(offer_id))
+            if selected_offer is None:
+                continue
+            shopping_list.append(
+                OfferInRecommendation.model_validate(
+                    selected_offer, update={"purchase_quantity": quantity}
+                )
             )
-        offers_string = json.dumps(offer_info)
+
+        return shopping_list
+
+    def get_budget_bucket(self, weekly_budget: str) -> float:
+        # Close budgets share their recommendation, rounded down to fit in both
+        try:
+            budget = float(weekly_budget)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid weekly budget")
+        if not math.isfinite(budget) or budget <= 0:
+            raise HTTPException(status_code=400, detail="Invalid weekly budget")
+
+        # Buckets are the powers of 1 + ratio, at most the ratio below the budget
+        base = 1 + settings.SHOPPING_LIST_CACHE_BUDGET_RATIO
+        bucket = base ** math.floor(math.log(budget, base))
+        # Rounding errors may land the power just above the budget
+        return math.floor(min(bucket, budget) * 100) / 100
+
+    def get_shopping_list_cache_key(self, catalog_version: int, budget: float) -> str:
+        # The LLM plans the meals from the current weekday
+        weekday = datetime.now().strftime("%A")
+        return (
+            f"{settings.PROJECT_NAME}:shopping_list:"
+            f"{catalog_version}:{budget:g}:{weekday}"
+        )
+
+    async def get_shopping_list_selection(
+        self, cache_key: str, generate_selection: Callable[[], list]
+    ) -> list[tuple[str, int]]:
+        """
+        Get the selected offer ids and quantities from the cache, or generate them
+
+        Concurrent requests for the same key wait for a single generation
+
+        :param cache_key:
+        :param generate_selection: called in a thread on a cache miss
+        :return:
+        """
+        cached_selection = await redis_client.get(cache_key)
+        if cached_selection is not None:
+            return json.loads(cached_selection)
+
+        task = self.pending_selections.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self.generate_shopping_list_selection(cache_key, generate_selection)
+            )
+            self.pending_selections[cache_key] = task
+            task.add_done_callback(
+                lambda _: self.pending_selections.pop(cache_key, None)
+            )
+        # A cancelled request doesn't cancel the others waiting for the task
+        return await asyncio.shield(task)
+
+    async def generate_shopping_list_selection(
+        self, cache_key: str, generate_selection: Callable[[], list]
+    ) -> list[tuple[str, int]]:
+        # The other workers wait for the lock, then read the cached selection
+        lock = redis_client.lock(
+            f"{cache_key}:lock",
+            timeout=settings.SHOPPING_LIST_CACHE_LOCK_TIMEOUT_SECONDS,
+            blocking_timeout=settings.SHOPPING_LIST_CACHE_LOCK_TIMEOUT_SECONDS,
+        )
+        acquired = await lock.acquire()
+        try:
+            cached_selection = await redis_client.get(cache_key)
+            if cached_selection is not None:
+                return json.loads(cached_selection)
+
+            selection = await run_in_threadpool(generate_selection)
+            await redis_client.set(
+                cache_key,
+                json.dumps(selection),
+                ex=settings.SHOPPING_LIST_CACHE_EXPIRE_SECONDS,
+            )
+            return selection
+        finally:
+            if acquired:
+                with suppress(LockError):
+                    await lock.release()
+
+    def solve_shopping_list(
+        self, offers: list[OfferPublic], budget: float
+    ) -> list[tuple[OfferPublic, int]]:
+        """
+        Choose the offers of a single store saving the most within the budget,
+        optionally re-ranked by OpenAI among the offers of that store
+
+        :param offers:
+        :param budget:
+        :return: the selected offers and their quantities
+        """
+        solution = solve_shopping_list(
+            offers,
+            budget=budget,
+            max_items=settings.SHOPPING_LIST_MAX_ITEMS,
+            max_quantity=settings.SHOPPING_LIST_MAX_QUANTITY,
+        )
+        if not settings.SHOPPING_LIST_LLM_RERANK or not solution.items:
+            return solution.items
+
+        # Keep the local list if the answer doesn't fit the constraints
+        selected_offers = self.generate_shopping_list(
+            solution.candidates, f"{budget:g}"
+        )
+        if (
+            selected_offers
+            and sum(quantity for _, quantity in selected_offers)
+            <= settings.SHOPPING_LIST_MAX_ITEMS
+            and sum(offer.price * quantity for offer, quantity in selected_offers)
+            <= budget
+        ):
+            return selected_offers
+        return solution.items
+
+    def generate_shopping_list(
+        self, offers: list[OfferPublic], weekly_budget: str
+    ) -> list[tuple[OfferPublic, int]] | None:
+        """
+        Ask OpenAI to choose among the offers
+
+        :param offers:
+        :param weekly_budget:
+        :return: the selected offers and their quantities, None on failure
+        """
+        # Only the best discounts are sent, identified by their index
+        catalog_size = len(offers)
+        offers = select_prompt_offers(
+            offers, max_offers=settings.SHOPPING_LIST_PROMPT_MAX_OFFERS
+        )
+        offers_string = encode_prompt_offers(offers)
+        logger.info(
+            f"Shopping list prompt: {len(offers)} of {catalog_size} offers, "
+            f"{len(offers_string)} characters"
+        )
         response = openai_client.gpt_4o_generate_shopping_list_with_completion(
             budget_string=weekly_budget, offers_string=offers_string
         )
         if not response:
-            raise HTTPException(
-                status_code=400,
-                detail="Unable to generate shopping list recommendation",
-            )
+            return None
 
+        selected_offers = []
         for offer in response["offers"]:
-            id, quantity = offer["id"], offer["quantity"]
-            selected_offers = [offer for offer in offers if str(offer.id) == id]
-            if len(selected_offers) > 0:
-                selected_offer = selected_offers[0]
-                img_url = cloudfront_client.generate_url(selected_offer.img)
-
-                for _ in range(quantity):
-                    new_id = uuid.uuid4()
-                    shopping_list.append(
-                        OfferPublic(
-                            **selected_offer.model_dump(exclude={"id"}),
-                            id=new_id,
-                            store_name=selected_offer.store.name,
-                            img_url=img_url,
-                        )
-                    )
-
-        return shopping_list
+            handle, quantity = offer["id"], int(offer["quantity"])
+            if handle.isdigit() and int(handle) < len(offers) and quantity > 0:
+                selected_offers.append((offers[int(handle)], quantity))
+        return selected_offers
 
 
 offer_service = OfferService()
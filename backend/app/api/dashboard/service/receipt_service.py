@@ -1,25 +1,34 @@
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import datetime
+import json
 import uuid
 
 from app.api.admin.model.token import Message
 from app.api.admin.model.user import User
-from app.api.dashboard.crud.crud_receipt import receipt_dao
+from app.api.dashboard.crud.crud_budget import budget_dao
+from app.api.dashboard.crud.crud_receipt import async_receipt_dao, receipt_dao
 from app.api.dashboard.model.receipt import (
     Receipt,
     ReceiptDetail,
     ReceiptCreate,
     ReceiptFileCreate,
     ReceiptItem,
-    ReceiptPublic,
     ReceiptUpdate,
     ReceiptDelete,
 )
-from app.api.dashboard.service.budget_service import budget_service
-from app.api.deps import SessionDep, CurrentUser
-from app.api.task.celery_task.receipt.tasks import process_receipts_upload_task
-from app.api.task.service.task_service import task_service
+from app.api.deps import AsyncSessionDep, AsyncCurrentUser, SessionDep, CurrentUser
+from app.api.task.celery_task.receipt.tasks import (
+    process_receipt_upload_task,
+    update_budget_by_upload_task,
+)
+from app.core.aws_s3 import s3_client
 from app.core.cloudfront import cloudfront_client
+from app.core.config import settings
+from app.core.db_redis import sync_redis_client
 from app.core.openai import openai_client
+from app.utils.image import preprocess_image, to_data_url
+from celery import chord, states
+from celery.utils import uuid as task_uuid
 from fastapi import HTTPException
 from sqlmodel import Session
 from sqlmodel.sql.expression import Select
@@ -28,14 +37,15 @@ from sqlmodel.sql.expression import Select
 class ReceiptService:
     def get_receipt_list_statement(
         self,
-        session: SessionDep,
-        current_user: CurrentUser,
+        session: AsyncSessionDep,
+        current_user: AsyncCurrentUser,
         description: str | None = None,
         category: str | None = None,
         start_date: datetime | None = None,
         end_date: datetime | None = None,
         order_by: str | None = None,
         order_type: str | None = None,
+        task_status: str | None = None,
     ) -> Select:
         statement = receipt_dao.get_receipt_list_statement(
             owner_id=current_user.id,
@@ -45,17 +55,20 @@ class ReceiptService:
             end_date=end_date,
             order_by=order_by,
             order_type=order_type,
+            task_status=task_status,
         )
         return statement
 
-    def get_receipt(self, session: SessionDep, id: uuid.UUID) -> ReceiptDetail:
-        receipt = receipt_dao.get_receipt_by_id(session=session, id=id)
+    async def get_receipt(
+        self, session: AsyncSessionDep, id: uuid.UUID
+    ) -> ReceiptDetail:
+        receipt = await async_receipt_dao.get_receipt_by_id(session=session, id=id)
         if not receipt:
             raise HTTPException(status_code=404, detail="Receipt not found")
         receipt_detail = ReceiptDetail.model_validate(receipt)
 
         if receipt_detail.file_name:
-            receipt_detail.file_url = cloudfront_client.generate_url(
+            receipt_detail.file_url = cloudfront_client.get_file_url(
                 receipt_detail.file_name
             )
         return receipt_detail
@@ -66,10 +79,10 @@ class ReceiptService:
         receipt = receipt_dao.create(
             session=session, receipt_in=receipt_in, owner_id=current_user.id
         )
-        self.update_budget(
+        self.update_budget_by_changes(
             session=session,
             current_user=current_user,
-            dates=[receipt.date],
+            changes=[(receipt.date, receipt.amount)],
         )
         receipt_detail = ReceiptDetail.model_validate(receipt)
         return receipt_detail
@@ -84,16 +97,18 @@ class ReceiptService:
         receipt = receipt_dao.get_receipt_by_id(session=session, id=id)
         if not receipt:
             raise HTTPException(status_code=404, detail="Item not found")
+        # The receipt is updated in place, so keep the previous values
+        previous_date, previous_amount = receipt.date, receipt.amount
         update_receipt = receipt_dao.update_receipt(
             session=session, current_receipt=receipt, receipt_in=receipt_in
         )
-        self.update_budget(
+        self.update_budget_by_changes(
             session=session,
             current_user=current_user,
-            dates=[
-                receipt.date,
-                update_receipt.date,
-            ],  # the previous ones also should be updated
+            changes=[
+                (previous_date, -previous_amount),
+                (update_receipt.date, update_receipt.amount),
+            ],
         )
         receipt_detail = ReceiptDetail.model_validate(update_receipt)
         return receipt_detail
@@ -112,10 +127,10 @@ class ReceiptService:
         if not receipts or len(receipts) != len(receipts_to_delete.ids):
             raise HTTPException(status_code=404, detail="Receipts not found")
 
-        self.update_budget(
+        self.update_budget_by_changes(
             session=session,
             current_user=current_user,
-            dates=[receipt.date for receipt in receipts],
+            changes=[(receipt.date, -receipt.amount) for receipt in receipts],
         )
 
     def create_receipts_by_upload(
@@ -134,33 +149,48 @@ class ReceiptService:
             )
             placeholder_receipts.append(placeholder_receipt)
 
+        # Each file is processed by its own task, so the ids are assigned
+        # upfront and saved with the placeholder receipts
+        task_ids = [task_uuid() for _ in placeholder_receipts]
         receipts_db = receipt_dao.create_receipts(
-            session=session, receipts=placeholder_receipts, owner_id=current_user.id
+            session=session,
+            receipts=placeholder_receipts,
+            owner_id=current_user.id,
+            task_ids=task_ids,
+            task_status=states.PENDING,
         )
 
-        # Start Celery task
-        task = process_receipts_upload_task.delay(
-            str(current_user.id),
-            [receipt.model_dump_json() for receipt in receipts_db],
-        )
+        user_id_str = str(current_user.id)
+        header = [
+            process_receipt_upload_task.s(user_id_str, receipt.model_dump_json()).set(
+                task_id=receipt.task_id
+            )
+            for receipt in receipts_db
+        ]
 
-        receipt_dao.update_receipt_tasks_status(
-            session=session, receipts=receipts_db, task_id=task.id
-        )
+        # Start Celery tasks, the budget is updated once all files are processed
+        callback = update_budget_by_upload_task.si(user_id_str, task_ids)
+        # The callback is skipped when any of the files fails,
+        # so it is also linked as errback to update the budget anyway
+        callback.link_error(update_budget_by_upload_task.si(user_id_str, task_ids))
+        chord(header)(callback)
 
     def process_receipts_upload(
         self,
         session: Session,
         current_user: User,
         receipts: list[Receipt],
-    ):
+        update_budget: bool = True,
+    ) -> dict:
         to_update_receipts = []
         to_create_receipts = []
+        # Extra receipts found in a file share the task id of the file
+        to_create_task_ids = []
 
-        for receipt_file in receipts:
-            image_url = cloudfront_client.generate_url(receipt_file.file_name)
-            response = openai_client.gpt_4o_analyse_image_with_completion(image_url)
+        results = [self.extract_receipt_file(receipt) for receipt in receipts]
+        cache_hits = sum(1 for _, cache_hit in results if cache_hit)
 
+        for receipt_file, (response, _) in zip(receipts, results):
             if not response:
                 raise HTTPException(
                     status_code=400, detail="Error processing image analysis"
@@ -208,81 +238,148 @@ class ReceiptService:
                         items=receipt_items,
                     )
                     to_create_receipts.append(new_receipt)
+                    to_create_task_ids.append(receipt_file.task_id)
 
                 receipt_num += 1
 
+        # Update the placeholder receipts, all of them must still exist
+        current_receipts = receipt_dao.get_receipts_by_ids(
+            session=session, ids=[receipt.id for receipt in to_update_receipts]
+        )
+        if len(current_receipts) != len(to_update_receipts):
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        receipt_dao.update_receipts(
+            session=session,
+            current_receipts=current_receipts,
+            receipts_in=to_update_receipts,
+        )
+
         # Create receipts
         receipt_dao.create_receipts(
-            session=session, receipts=to_create_receipts, owner_id=current_user.id
+            session=session,
+            receipts=to_create_receipts,
+            owner_id=current_user.id,
+            task_ids=to_create_task_ids,
+            task_status=states.STARTED,
         )
 
-        # Update receipts
-        for receipt_to_update in to_update_receipts:
-            current_receipt = receipt_dao.get_receipt_by_id(
-                session=session, id=receipt_to_update.id
-            )
-            if not current_receipt:
-                raise HTTPException(status_code=404, detail="Item not found")
-
-            receipt_dao.update_receipt(
+        if update_budget:
+            self.update_budget(
                 session=session,
-                current_receipt=current_receipt,
-                receipt_in=receipt_to_update,
+                current_user=current_user,
+                dates=(
+                    receipt.date
+                    for receipt in (to_create_receipts + to_update_receipts)
+                ),
             )
 
+        # Metrics reported as the result of the task
+        return {
+            "files": len(receipts),
+            "receipts": len(to_create_receipts) + len(to_update_receipts),
+            "cache_hits": cache_hits,
+        }
+
+    def update_budget_by_tasks(
+        self, session: Session, current_user: User, task_ids: list[str]
+    ) -> None:
+        receipts = receipt_dao.get_receipts_by_task_ids(
+            session=session, owner_id=current_user.id, task_ids=task_ids
+        )
         self.update_budget(
             session=session,
             current_user=current_user,
-            dates=(
-                receipt.date for receipt in (to_create_receipts + to_update_receipts)
-            ),
+            dates=[receipt.date for receipt in receipts],
         )
 
-    def update_receipt_task_status(self, receipt: ReceiptPublic):
-        if receipt.task_id:
-            task_result = task_service.get_result(receipt.task_id)
-            receipt.task_status = task_result.status
-            if task_result.successful():
-                receipt.task_message = task_result.info
-            else:
-                receipt.task_message = task_result.traceback
-        return receipt
+    def extract_receipt_file(self, receipt_file: Receipt) -> tuple[dict | None, bool]:
+        """
+        Extract receipts from an uploaded file
+
+        :return: the extracted data and whether it comes from the cache
+        """
+        # Same content means same ETag, so re-uploaded files skip the extraction
+        etag = s3_client.get_etag(receipt_file.file_name)
+        cache_key = self.get_extraction_cache_key(etag) if etag else None
+
+        if cache_key:
+            cached_response = sync_redis_client.get(cache_key)
+            if cached_response:
+                return json.loads(cached_response), True
+
+        image_url = self.get_receipt_image_url(receipt_file)
+        response = openai_client.gpt_4o_analyse_image_with_completion(image_url)
+
+        if response and cache_key:
+            sync_redis_client.setex(
+                cache_key,
+                settings.RECEIPT_EXTRACTION_CACHE_EXPIRE_SECONDS,
+                json.dumps(response),
+            )
+        return response, False
+
+    def get_receipt_image_url(self, receipt_file: Receipt) -> str:
+        # Send a compact version of the photo inline instead of the full-size
+        # file, other files like PDF statements are sent as they are
+        if settings.RECEIPT_IMAGE_PREPROCESSING:
+            content = s3_client.get_file(receipt_file.file_name)
+            if content:
+                image = preprocess_image(
+                    content,
+                    max_edge=settings.RECEIPT_IMAGE_MAX_EDGE,
+                    grayscale=settings.RECEIPT_IMAGE_GRAYSCALE,
+                    quality=settings.RECEIPT_IMAGE_JPEG_QUALITY,
+                )
+                if image:
+                    return to_data_url(image)
+
+        # OpenAI fetches the file itself, so the URL is always signed
+        return cloudfront_client.generate_url(receipt_file.file_name)
+
+    def get_extraction_cache_key(self, etag: str) -> str:
+        return f"{settings.PROJECT_NAME}:receipt_extraction:{etag}"
 
     # Update budget when update receipts
-    def update_budget(
-        self, session: SessionDep, current_user: CurrentUser, dates: list[datetime]
+    def update_budget_by_changes(
+        self,
+        session: SessionDep,
+        current_user: CurrentUser,
+        changes: list[tuple[datetime, float]],
     ) -> None:
-        str_dates = set([date.strftime("%Y-%m") for date in dates])
+        """
+        Update the budgets after receipts are written
 
-        for str_date in str_dates:
-            self.update_budget_recorded_expense(
+        :param changes: date and signed amount of each added or removed receipt
+        """
+        if settings.BUDGET_UPDATE_MODE != "incremental":
+            self.update_budget(
                 session=session,
                 current_user=current_user,
-                date=datetime.strptime(str_date, "%Y-%m"),
+                dates=[date for date, _ in changes],
             )
+            return
 
-    def update_budget_recorded_expense(
-        self, session: SessionDep, current_user: CurrentUser, date: datetime
-    ):
-        start_date = datetime(date.year, date.month, 1)
-        end_date = datetime(date.year, date.month + 1, 1) - timedelta(days=1)
+        deltas = defaultdict(float)
+        for date, amount in changes:
+            deltas[date.strftime("%Y-%m")] += amount
 
-        receipts = receipt_dao.get_receipt_list(
-            session=session,
-            owner_id=current_user.id,
-            start_date=start_date,
-            end_date=end_date,
+        # Months without a budget yet are created from the receipts
+        missing_months = budget_dao.add_recorded_expenses(
+            session=session, owner_id=current_user.id, deltas=deltas
+        )
+        budget_dao.update_recorded_expenses(
+            session=session, owner_id=current_user.id, months=missing_months
         )
 
-        total_amount = sum(receipt.amount for receipt in receipts)
-
-        month_str = date.strftime("%Y-%m")
-
-        budget_service.create_budget_from_receipts(
+    def update_budget(
+        self, session: SessionDep, current_user: CurrentUser, dates: list[datetime]
+    ) -> None:
+        # The expenses of all months are summed and saved with one statement
+        budget_dao.update_recorded_expenses(
             session=session,
-            current_user=current_user,
-            date=month_str,
-            amount=total_amount,
+            owner_id=current_user.id,
+            months=list({date.strftime("%Y-%m") for date in dates}),
         )
 
 
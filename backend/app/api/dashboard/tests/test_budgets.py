@@ -0,0 +1,58 @@
+from collections.abc import Generator
+from datetime import datetime
+import uuid
+
+import pytest
+from sqlmodel import Session, delete
+
+from app.api.admin.model.user import User
+from app.api.dashboard.crud.crud_budget import budget_dao
+from app.api.dashboard.model.budget import Budget
+from app.api.dashboard.service.receipt_service import receipt_service
+from app.core.config import settings
+from app.core.db_postgres import engine
+
+
+@pytest.fixture()
+def user() -> Generator[User, None, None]:
+    with Session(engine) as session:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        session.add(user)
+        session.add(
+            Budget(owner_id=user.id, date="2024-05", budget=100.0, surplus=100.0)
+        )
+        session.commit()
+        session.refresh(user)
+        yield user
+        session.exec(delete(Budget).where(Budget.owner_id == user.id))
+        session.exec(delete(User).where(User.id == user.id))
+        session.commit()
+
+
+def test_update_budget_by_changes_incremental(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "BUDGET_UPDATE_MODE", "incremental")
+    recomputed_months = []
+    update_recorded_expenses = budget_dao.update_recorded_expenses
+
+    def spy(session: Session, owner_id: uuid.UUID, months: list[str]) -> None:
+        recomputed_months.extend(months)
+        update_recorded_expenses(session=session, owner_id=owner_id, months=months)
+
+    monkeypatch.setattr(budget_dao, "update_recorded_expenses", spy)
+
+    with Session(engine) as session:
+        receipt_service.update_budget_by_changes(
+            session=session,
+            current_user=user,
+            changes=[(datetime(2024, 5, 3), 30.0), (datetime(2024, 6, 1), 20.0)],
+        )
+        budget = budget_dao.get_budget_by_date(
+            session=session, owner_id=user.id, date="2024-05"
+        )
+
+    # Only the month without a budget goes through the full recompute
+    assert recomputed_months == ["2024-06"]
+    assert budget.recorded_expense == 30.0
+    assert budget.surplus == 70.0
@@ -0,0 +1,61 @@
+from collections.abc import Generator
+from datetime import datetime
+import uuid
+
+import pytest
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import Select
+
+from app.api.dashboard.crud.crud_receipt import receipt_dao
+from app.api.dashboard.model.budget import Budget
+from app.api.dashboard.model.offer import Offer
+from app.api.dashboard.model.receipt import ReceiptItem
+from app.core.db_postgres import engine
+
+
+@pytest.fixture()
+def session() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        # Tables are small in tests, make the planner pick any usable index
+        session.connection().exec_driver_sql("SET LOCAL enable_seqscan = off")
+        yield session
+        session.rollback()
+
+
+def explain(session: Session, statement: Select) -> str:
+    compiled = statement.compile(dialect=engine.dialect)
+    rows = (
+        session.connection()
+        .exec_driver_sql(f"EXPLAIN {compiled}", compiled.params)
+        .all()
+    )
+    return "\n".join(row[0] for row in rows)
+
+
+def test_receipt_list_uses_owner_date_index(session: Session) -> None:
+    statement = receipt_dao.get_receipt_list_statement(
+        owner_id=uuid.uuid4(),
+        start_date=datetime(2024, 1, 1),
+        end_date=datetime(2024, 12, 31),
+    )
+    assert "ix_receipt_owner_id_date" in explain(session, statement)
+
+
+def test_budget_by_date_uses_owner_date_index(session: Session) -> None:
+    statement = select(Budget).where(
+        Budget.owner_id == uuid.uuid4(), Budget.date == "2024-12"
+    )
+    assert "ix_budget_owner_id_date" in explain(session, statement)
+
+
+def test_receipt_items_use_receipt_index(session: Session) -> None:
+    statement = select(ReceiptItem).where(ReceiptItem.receipt_id == uuid.uuid4())
+    assert "ix_receipt_item_receipt_id" in explain(session, statement)
+
+
+def test_offers_use_store_and_category_indexes(session: Session) -> None:
+    statement = select(Offer).where(Offer.store_id == uuid.uuid4())
+    assert "ix_offer_store_id" in explain(session, statement)
+
+    statement = select(Offer).where(Offer.category == "groceries")
+    assert "ix_offer_category" in explain(session, statement)
@@ -0,0 +1,28 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.dashboard.service.offer_service import offer_service
+from app.core.config import settings
+
+
+@pytest.mark.parametrize("weekly_budget", ["1", "50", "99", "100", "1234.56"])
+def test_get_budget_bucket(weekly_budget: str) -> None:
+    budget = float(weekly_budget)
+    bucket = offer_service.get_budget_bucket(weekly_budget)
+
+    assert bucket <= budget
+    assert bucket >= budget * (1 - settings.SHOPPING_LIST_CACHE_BUDGET_RATIO) - 0.01
+
+
+def test_get_budget_bucket_close_budgets() -> None:
+    assert offer_service.get_budget_bucket("98.5") == offer_service.get_budget_bucket(
+        "99"
+    )
+
+
+@pytest.mark.parametrize("weekly_budget", ["abc", "inf", "-inf", "nan", "0", "-5"])
+def test_get_budget_bucket_invalid(weekly_budget: str) -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        offer_service.get_budget_bucket(weekly_budget)
+
+    assert exc_info.value.status_code == 400
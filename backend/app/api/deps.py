@@ -1,18 +1,19 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
 import jwt
 from app.api.admin.model.token import TokenPayload
 from app.api.admin.model.user import User
+from app.api.admin.service.user_cache_service import user_cache_service
 from app.core import security
 from app.core.config import settings
-from app.core.db_postgres import engine
-from app.core.security import redis_token_authenticate
+from app.core.db_postgres import async_engine, engine
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Used by swagger, to get the access token
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -25,11 +26,18 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # Relationships can't be lazy loaded in async, keep the loaded attributes
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-async def get_current_user(session: SessionDep, token: TokenDep) -> User:
+async def get_async_current_user(session: AsyncSessionDep, token: TokenDep) -> User:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -40,8 +48,9 @@ async def get_current_user(session: SessionDep, token: TokenDep) -> User:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
-    await redis_token_authenticate(id=token_data.sub, token=token)
-    user = session.get(User, token_data.sub)
+    user = await user_cache_service.authenticate(
+        session=session, id=token_data.sub, token=token
+    )
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     if not user.is_active:
@@ -49,6 +58,15 @@ async def get_current_user(session: SessionDep, token: TokenDep) -> User:
     return user
 
 
+AsyncCurrentUser = Annotated[User, Depends(get_async_current_user)]
+
+
+async def get_current_user(session: SessionDep, user: AsyncCurrentUser) -> User:
+    # The write routes add and delete the user through the sync session, it is
+    # merged without a query
+    return session.merge(user, load=False)
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
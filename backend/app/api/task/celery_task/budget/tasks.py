@@ -0,0 +1,26 @@
+import logging
+
+from app.core.celery import celery_app
+from app.api.dashboard.crud.crud_budget import budget_dao
+from app.api.deps import get_db
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task()
+def reconcile_budgets_task():
+    db = next(get_db())
+
+    try:
+        # Budgets are maintained incrementally, fix the totals that drifted
+        fixed_budgets = budget_dao.reconcile_recorded_expenses(db)
+        if fixed_budgets:
+            logger.warning(
+                f"Reconciled the recorded expense of {fixed_budgets} budgets"
+            )
+        return fixed_budgets
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
@@ -1,4 +1,7 @@
+import json
 import uuid
+from celery import states
+from celery.signals import task_failure, task_prerun, task_success
 from app.core.celery import celery_app
 from app.api.dashboard.model.receipt import Receipt
 from app.api.admin.model.user import User
@@ -6,19 +9,73 @@ from app.api.deps import get_db
 
 
 @celery_app.task()
-def process_receipts_upload_task(user_id_str: str, receipts_data: list[str]):
+def process_receipt_upload_task(user_id_str: str, receipt_data: str):
     user_id = uuid.UUID(user_id_str)
     db = next(get_db())
     current_user = db.get(User, user_id)
-    receipts = [Receipt.model_validate_json(receipt) for receipt in receipts_data]
+    receipt = Receipt.model_validate_json(receipt_data)
 
     try:
         from app.api.dashboard.service.receipt_service import receipt_service
 
-        receipt_service.process_receipts_upload(db, current_user, receipts)
+        # The budget is updated once for the whole upload by the chord callback
+        metrics = receipt_service.process_receipts_upload(
+            db, current_user, [receipt], update_budget=False
+        )
         db.commit()
+        return metrics
     except Exception as e:
         db.rollback()
         raise e
     finally:
         db.close()
+
+
+@celery_app.task()
+def update_budget_by_upload_task(user_id_str: str, task_ids: list[str]):
+    user_id = uuid.UUID(user_id_str)
+    db = next(get_db())
+    current_user = db.get(User, user_id)
+
+    try:
+        from app.api.dashboard.service.receipt_service import receipt_service
+
+        receipt_service.update_budget_by_tasks(db, current_user, task_ids)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def update_receipts_task_status(
+    task_id: str, task_status: str, task_message: str | None = None
+) -> None:
+    db = next(get_db())
+
+    try:
+        from app.api.dashboard.crud.crud_receipt import receipt_dao
+
+        receipt_dao.update_receipts_task_status(
+            db, task_id=task_id, task_status=task_status, task_message=task_message
+        )
+    finally:
+        db.close()
+
+
+# The status of the upload tasks is kept on the receipts, so the receipt list
+# doesn't have to query the result backend
+@task_prerun.connect(sender=process_receipt_upload_task)
+def on_receipt_upload_started(task_id: str, **kwargs):
+    update_receipts_task_status(task_id, states.STARTED)
+
+
+@task_success.connect(sender=process_receipt_upload_task)
+def on_receipt_upload_succeeded(sender, result, **kwargs):
+    update_receipts_task_status(sender.request.id, states.SUCCESS, json.dumps(result))
+
+
+@task_failure.connect(sender=process_receipt_upload_task)
+def on_receipt_upload_failed(task_id: str, exception: Exception, **kwargs):
+    update_receipts_task_status(task_id, states.FAILURE, str(exception))
@@ -1,10 +1,10 @@
 from typing import Annotated
-from app.api.deps import get_current_user
+from app.api.deps import get_async_current_user
 from app.common.response.response_schema import ResponseModel, response_base
 from fastapi import APIRouter, Depends, Query, Response, Path, Body
 from app.api.task.service.task_service import task_service
 
-router = APIRouter(dependencies=[Depends(get_current_user)])
+router = APIRouter(dependencies=[Depends(get_async_current_user)])
 
 
 @router.get("/test")
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from app.api.utils.routes.admin.email import router as email_router
+from app.api.utils.routes.admin.metrics import router as metrics_router
 
 router = APIRouter(tags=['Admin related'])
-router.include_router(email_router)
\ No newline at end of file
+router.include_router(email_router)
+router.include_router(metrics_router)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import os
+
+from app.api.deps import get_current_active_superuser
+from app.common.response.response_schema import ResponseModel, response_base
+from app.core.db_postgres import async_engine, engine, get_pool_status
+from fastapi import APIRouter, Depends
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics/db-pool",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+async def get_db_pool_metrics() -> ResponseModel:
+    """
+    Pool metrics of the worker serving the request, every worker has its own
+    pools, so sample repeatedly to cover them all.
+    """
+    metrics = {
+        "pid": os.getpid(),
+        "sync": get_pool_status(engine),
+        "async": get_pool_status(async_engine.sync_engine),
+    }
+    return await response_base.success(data=metrics)
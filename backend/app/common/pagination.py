@@ -0,0 +1,30 @@
+from typing import Generic, TypeVar
+
+from fastapi import Query
+from fastapi_pagination.bases import CursorRawParams
+from fastapi_pagination.cursor import CursorPage as BaseCursorPage
+from fastapi_pagination.cursor import CursorParams as BaseCursorParams
+
+T = TypeVar("T")
+
+
+class CursorParams(BaseCursorParams):
+    # Counting all rows costs as much as an OFFSET scan, so it is opt-in
+    include_total: bool = Query(
+        False, alias="includeTotal", description="Include the total count"
+    )
+
+    def to_raw_params(self) -> CursorRawParams:
+        raw_params = super().to_raw_params()
+        raw_params.include_total = self.include_total
+        return raw_params
+
+
+class CursorPage(BaseCursorPage[T], Generic[T]):
+    """
+    Keyset page, the cursor holds the ordering values of the last row, so any
+    page costs the same as the first one. The statement must be ordered by
+    non-null columns ending with a unique one.
+    """
+
+    __params_type__ = CursorParams
@@ -23,6 +23,27 @@ class S3Client:
             return None
         return response_url
 
+    def get_file(self, file_name: str):
+        try:
+            response = self.client.get_object(
+                Bucket=settings.AWS_BUCKET_NAME, Key=file_name
+            )
+        except Exception as e:
+            print(e)
+            return None
+        return response["Body"].read()
+
+    # The ETag is the MD5 of the content for files uploaded in one part
+    def get_etag(self, file_name: str):
+        try:
+            response = self.client.head_object(
+                Bucket=settings.AWS_BUCKET_NAME, Key=file_name
+            )
+        except Exception as e:
+            print(e)
+            return None
+        return response["ETag"].strip('"')
+
     def delete_file(self, file_name: str):
         try:
             self.client.delete_object(Bucket=settings.AWS_BUCKET_NAME, Key=file_name)
@@ -31,10 +31,26 @@ celery_app.conf.broker_connection_retry_on_startup = True
 celery_app.conf.task_routes = {
     "app.api.task.celery_task.tasks.*": "main-queue",
     "app.api.task.celery_task.receipt.tasks.*": "main-queue",
+    "app.api.task.celery_task.budget.tasks.*": "main-queue",
+    # Chords are joined by polling with the database result backend
+    "celery.chord_unlock": "main-queue",
 }
 
 # Autodiscover tasks in the specified module
 # Tasks must be in the files named tasks.py!
 celery_app.autodiscover_tasks(
-    ["app.api.task.celery_task", "app.api.task.celery_task.receipt"]
+    [
+        "app.api.task.celery_task",
+        "app.api.task.celery_task.receipt",
+        "app.api.task.celery_task.budget",
+    ]
 )
+
+# Periodic tasks, sent by the celerybeat service (beat-start.sh), which runs as
+# a single replica so each task is sent once
+celery_app.conf.beat_schedule = {
+    "reconcile-budgets": {
+        "task": "app.api.task.celery_task.budget.tasks.reconcile_budgets_task",
+        "schedule": settings.BUDGET_RECONCILIATION_INTERVAL_SECONDS,
+    },
+}
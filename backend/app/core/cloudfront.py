@@ -1,5 +1,8 @@
 import base64
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
+import threading
 from botocore.signers import CloudFrontSigner
 from app.core.config import settings
 from cryptography.hazmat.backends import default_backend
@@ -8,19 +11,27 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 
 
-def rsa_signer(message):
-    private_key = serialization.load_pem_private_key(
+# Parsing the key costs more than signing, so it is done once per process
+@lru_cache
+def get_private_key():
+    return serialization.load_pem_private_key(
         # load the private key from the environment variable as a string
         base64.b64decode(settings.CLOUDFRONT_PRIVATE_KEY_STRING),
         password=None,
         backend=default_backend(),
     )
-    return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+
+
+def rsa_signer(message):
+    return get_private_key().sign(message, padding.PKCS1v15(), hashes.SHA1())
 
 
 class CloudFrontClient:
     def __init__(self):
         self.signer = CloudFrontSigner(settings.CLOUDFRONT_KEY_ID, rsa_signer)
+        # LRU of signed URLs by file name, with their expiry time
+        self.url_cache: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+        self.url_cache_lock = threading.Lock()
 
     # These cookies and urls are used to get files in S3 bucket through cloudfront
     def generate_cookie(self):
@@ -43,14 +54,47 @@ class CloudFrontClient:
             "CloudFront-Key-Pair-Id": key_id,
         }
 
+    def get_file_url(self, file_name: str):
+        """
+        URL of a file returned to the client, signed unless the client is
+        authorized by the signed cookie
+        """
+        return self.get_file_url_with_expiry(file_name)[0]
+
+    def get_file_url_with_expiry(self, file_name: str) -> tuple[str, datetime | None]:
+        """
+        Same as get_file_url, with the expiry time of signed URLs
+        """
+        if settings.CLOUDFRONT_DELIVERY_MODE == "signed_cookie":
+            return settings.CLOUDFRONT_DISTRIBUTION_DOMAIN + "/" + file_name, None
+        return self.generate_url_with_expiry(file_name)
+
     def generate_url(self, file_name: str):
+        return self.generate_url_with_expiry(file_name)[0]
+
+    def generate_url_with_expiry(self, file_name: str) -> tuple[str, datetime]:
+        now = datetime.now()
+        margin = timedelta(seconds=settings.CLOUDFRONT_URL_CACHE_MARGIN_SECONDS)
+
+        with self.url_cache_lock:
+            cached_url = self.url_cache.get(file_name)
+            if cached_url and cached_url[1] - now > margin:
+                self.url_cache.move_to_end(file_name)
+                return cached_url
+
         url = settings.CLOUDFRONT_DISTRIBUTION_DOMAIN + "/" + file_name
 
-        expire_at = datetime.now() + timedelta(hours=1)
+        expire_at = now + timedelta(seconds=settings.CLOUDFRONT_URL_EXPIRE_SECONDS)
 
         signed_url = self.signer.generate_presigned_url(url, date_less_than=expire_at)
 
-        return signed_url
+        with self.url_cache_lock:
+            self.url_cache[file_name] = (signed_url, expire_at)
+            self.url_cache.move_to_end(file_name)
+            while len(self.url_cache) > settings.CLOUDFRONT_URL_CACHE_SIZE:
+                self.url_cache.popitem(last=False)
+
+        return signed_url, expire_at
 
 
 cloudfront_client = CloudFrontClient()
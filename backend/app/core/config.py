@@ -54,6 +54,16 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str = ""
+    # Pool of each engine, sync and async, in every worker process
+    POSTGRES_POOL_SIZE: int = 5
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_TIMEOUT_SECONDS: int = 30
+    # Connections are replaced once older than this, and tested before use
+    # so the ones dropped by a failover are not handed out
+    POSTGRES_POOL_RECYCLE_SECONDS: int = 60 * 30
+    POSTGRES_POOL_PRE_PING: bool = True
+    # Statements running longer are cancelled by Postgres, 0 disables it
+    POSTGRES_STATEMENT_TIMEOUT_MS: int = 30 * 1000
 
     @computed_field  # type: ignore[misc]
     @property
@@ -74,6 +84,10 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str
     REDIS_DATABASE: int
     REDIS_TIMEOUT: int = 5
+    # Authenticated users are cached in memory and in Redis, writes to a user
+    # drop it from both
+    USER_CACHE_EXPIRE_SECONDS: int = 60 * 5
+    USER_CACHE_SIZE: int = 10000
 
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
@@ -83,8 +97,42 @@ class Settings(BaseSettings):
     CLOUDFRONT_DISTRIBUTION_DOMAIN: str
     CLOUDFRONT_KEY_ID: str
     CLOUDFRONT_PRIVATE_KEY_STRING: str
+    # Signed URLs are reused until they are about to expire
+    CLOUDFRONT_URL_EXPIRE_SECONDS: int = 60 * 60
+    CLOUDFRONT_URL_CACHE_MARGIN_SECONDS: int = 60 * 5
+    CLOUDFRONT_URL_CACHE_SIZE: int = 10000
+    # With signed cookies, files are returned as plain paths and the client
+    # gets them with the wildcard cookie from /auth/aws/generate-presigned-cookie
+    CLOUDFRONT_DELIVERY_MODE: Literal["signed_url", "signed_cookie"] = "signed_url"
+    # Offers are kept in memory, reloaded on writes or before their signed
+    # image URLs expire
+    OFFER_CATALOG_MAX_AGE_SECONDS: int = 60 * 30
+    # Shopping lists are solved locally, or by OpenAI over the whole catalog.
+    # The local list can be re-ranked by OpenAI among the offers of its store
+    SHOPPING_LIST_SOLVER: Literal["local", "llm"] = "local"
+    SHOPPING_LIST_LLM_RERANK: bool = False
+    SHOPPING_LIST_MAX_ITEMS: int = 15
+    SHOPPING_LIST_MAX_QUANTITY: int = 3
+    # Max number of offers sent to OpenAI, by discount ratio and category
+    SHOPPING_LIST_PROMPT_MAX_OFFERS: int = 200
+    # Recommendations are cached by catalog version, budget and weekday,
+    # budgets are rounded down by at most the ratio
+    SHOPPING_LIST_CACHE_BUDGET_RATIO: float = 0.05
+    SHOPPING_LIST_CACHE_EXPIRE_SECONDS: int = 60 * 60 * 24
+    SHOPPING_LIST_CACHE_LOCK_TIMEOUT_SECONDS: int = 60
 
     OPENAI_KEY: str
+    # Extracted receipts are cached by the ETag of the uploaded file
+    RECEIPT_EXTRACTION_CACHE_EXPIRE_SECONDS: int = 60 * 60 * 24 * 30
+    # Receipt photos can be shrunk before being sent to OpenAI inline
+    RECEIPT_IMAGE_PREPROCESSING: bool = False
+    RECEIPT_IMAGE_MAX_EDGE: int = 2048
+    RECEIPT_IMAGE_GRAYSCALE: bool = True
+    RECEIPT_IMAGE_JPEG_QUALITY: int = 80
+    # Receipt writes either apply their amount deltas to the budgets or
+    # recompute the whole months, the totals are reconciled periodically
+    BUDGET_UPDATE_MODE: Literal["incremental", "full"] = "incremental"
+    BUDGET_RECONCILIATION_INTERVAL_SECONDS: int = 60 * 60 * 24
 
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
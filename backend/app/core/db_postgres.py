@@ -1,10 +1,129 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy import Engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Session, create_engine, select
 
 from app.api.admin.model.user import UserCreate, User
 from app.api.admin.crud.crud_user import user_dao
 from app.core.config import settings
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+class PoolMetrics:
+    """
+    Checkout times of a pool, as a cumulative histogram in seconds
+    """
+
+    buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total_seconds = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total_seconds += seconds
+            self.timeouts += timed_out
+
+    def get_histogram(self) -> dict:
+        with self.lock:
+            counts = self.counts[:]
+            total_seconds = self.total_seconds
+            timeouts = self.timeouts
+        histogram = {}
+        cumulative = 0
+        for bucket, count in zip(self.buckets, counts):
+            cumulative += count
+            histogram[f"{bucket:g}"] = cumulative
+        histogram["+Inf"] = cumulative + counts[-1]
+        return {
+            "count": histogram["+Inf"],
+            "sum": total_seconds,
+            "timeouts": timeouts,
+            "buckets": histogram,
+        }
+
+
+class InstrumentedPoolMixin:
+    """
+    Times every checkout, waiting for a free connection included
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_engine_options() -> dict:
+    options = {
+        "pool_size": settings.POSTGRES_POOL_SIZE,
+        "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+        "pool_timeout": settings.POSTGRES_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.POSTGRES_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,
+    }
+    if settings.POSTGRES_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.POSTGRES_STATEMENT_TIMEOUT_MS}"
+        }
+    return options
+
+
+def get_pool_status(engine: Engine) -> dict:
+    """
+    The connections of the pool of an engine, in the current worker
+
+    :param engine:
+    :return:
+    """
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # Negative while the pool has not opened all its connections yet
+        "overflow": pool.overflow(),
+        "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+        "checkout_seconds": pool.metrics.get_histogram(),
+    }
+
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedQueuePool,
+    **get_engine_options(),
+)
+# Used by the async routes, psycopg runs the same URL in async mode
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedAsyncQueuePool,
+    **get_engine_options(),
+)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
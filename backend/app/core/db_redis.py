@@ -1,6 +1,7 @@
 import sys
 
 from app.core.config import settings
+from redis import Redis as SyncRedis
 from redis.asyncio.client import Redis
 from redis.exceptions import AuthenticationError, TimeoutError
 
@@ -26,26 +27,54 @@ class RedisClient(Redis):
         except Exception as e:
             sys.exit()
 
-    async def delete_prefix(self, prefix: str, exclude: str | list = None):
+    async def delete_prefix(
+        self, prefix: str, exclude: str | list = None, count: int = 1000
+    ) -> int:
         """
         remove all keys with same prefix
 
+        Each page of SCAN is unlinked in the pipeline fetching the next one,
+        so the keys are never all held in memory
+
         :param prefix:
         :param exclude:
-        :return:
+        :param count: SCAN count hint, the number of keys visited per page
+        :return: the number of keys removed
         """
-        keys = []
-        async for key in self.scan_iter(match=f"{prefix}*"):
-            if isinstance(exclude, str):
-                if key != exclude:
-                    keys.append(key)
-            elif isinstance(exclude, list):
-                if key not in exclude:
-                    keys.append(key)
-            else:
-                keys.append(key)
-        for key in keys:
-            await self.delete(key)
+        if isinstance(exclude, str):
+            exclude = [exclude]
+        exclude = set(exclude or [])
+        match = f"{prefix}*"
+        removed = 0
+        cursor, keys = await self.scan(0, match=match, count=count)
+        while True:
+            keys = [key for key in keys if key not in exclude]
+            if cursor == 0:
+                if keys:
+                    removed += await self.unlink(*keys)
+                return removed
+            async with self.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.unlink(*keys)
+                pipe.scan(cursor, match=match, count=count)
+                results = await pipe.execute()
+            if keys:
+                removed += results[0]
+            cursor, keys = results[-1]
+
+
+# Used by the Celery worker, which runs the tasks synchronously
+class SyncRedisClient(SyncRedis):
+    def __init__(self):
+        super(SyncRedisClient, self).__init__(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD,
+            db=settings.REDIS_DATABASE,
+            socket_timeout=settings.REDIS_TIMEOUT,
+            decode_responses=True,  # decode utf-8
+        )
 
 
 redis_client = RedisClient()
+sync_redis_client = SyncRedisClient()
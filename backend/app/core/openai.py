@@ -2,6 +2,9 @@ from datetime import datetime
 from app.core.config import settings
 from openai import OpenAI
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 receipt_prompt = """
 This is a credit card statement or a shopping receipt that contains a lot of transaction information for various items. I would like you to act as a secretary to organize and extract the details for me.
@@ -37,7 +40,8 @@ Today is {weekday}, and below is this week’s budget and the discounts found:
 
 Weekly Budget: {budget_string}
 
-Offers: {offers_string}
+Offers, as CSV rows identified by their id:
+{offers_string}
 """
 
 extract_receipt_function = {
@@ -168,7 +172,7 @@ shopping_list_parameters = {
                 "properties": {
                     "id": {
                         "type": "string",
-                        "description": "unique identifier of the offer",
+                        "description": "id of the offer in the CSV rows",
                     },
                     "quantity": {
                         "type": "number",
@@ -298,6 +302,10 @@ class OpenaiClient:
                     },
                 },
             )
+            logger.info(
+                f"Shopping list tokens: {response.usage.prompt_tokens} prompt, "
+                f"{response.usage.completion_tokens} completion"
+            )
             content = response.choices[0].message.content
             content = (
                 content.replace("```json\n", "").replace("\n```", "").replace("\n", "")
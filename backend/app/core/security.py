@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import time
 from typing import Any
 
 import jwt
@@ -12,25 +13,50 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
 
+def get_token_key(id: str | Any) -> str:
+    return f"{settings.PROJECT_NAME}:tokens:{str(id)}"
+
+
 async def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.utcnow() + expires_delta
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    # Use redis to save the access token
-    key = f"{settings.PROJECT_NAME}:{str(subject)}:{encoded_jwt}"
-    await redis_client.setex(key, int(expires_delta.total_seconds()), encoded_jwt)
+    # The tokens of a user are kept in a sorted set, scored by their expiry
+    key = get_token_key(subject)
+    now = time.time()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zadd(key, {encoded_jwt: now + expires_delta.total_seconds()})
+        pipe.zremrangebyscore(key, "-inf", now)
+        # Tokens have the same lifetime, the set expires with the newest one
+        pipe.expire(key, int(expires_delta.total_seconds()))
+        await pipe.execute()
     return encoded_jwt
 
 
-async def redis_token_authenticate(id: str, token: str) -> bool:
-    key = f"{settings.PROJECT_NAME}:{id}:{token}"
-    token_verify = await redis_client.get(key)
-    if not token_verify:
+async def redis_token_authenticate(id: str, token: str, *keys: str) -> list:
+    """
+    Check the token, reading the other keys in the same round trip
+
+    :param id:
+    :param token:
+    :param keys:
+    :return: the values of the other keys
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zscore(get_token_key(id), token)
+        for key in keys:
+            pipe.get(key)
+        expire_at, *values = await pipe.execute()
+    if expire_at is None or expire_at <= time.time():
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token is expired",
         )
-    return True
+    return values
+
+
+async def revoke_tokens(id: str | Any) -> None:
+    await redis_client.unlink(get_token_key(id))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -1,6 +1,9 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 import sentry_sdk
+from app.api.admin.service.user_cache_service import user_cache_service
+from app.api.dashboard.service.catalog_service import catalog_service
 from app.api.router import api_router
 from app.core.config import settings
 from app.core.db_redis import redis_client
@@ -27,8 +30,16 @@ async def register_init(app: FastAPI):
     """
     # connect to redis
     await redis_client.open()
+    # drop the offer catalog when offers change
+    catalog_listener = asyncio.create_task(catalog_service.listen_invalidations())
+    # drop the cached users written by other workers
+    user_cache_listener = asyncio.create_task(
+        user_cache_service.listen_invalidations()
+    )
     yield
 
+    catalog_listener.cancel()
+    user_cache_listener.cancel()
     # close redis
     await redis_client.close()
 
@@ -1,5 +1,6 @@
 from sqlmodel import Field, SQLModel, create_engine
 from app.core.config import settings
+from app.core.db_postgres import engine, get_pool_status
 
 
 def test_postgres_database():
@@ -12,3 +13,22 @@ def test_postgres_database():
     engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
     SQLModel.metadata.create_all(engine)
+
+
+def test_pool_settings():
+    with engine.connect() as connection:
+        # In milliseconds
+        statement_timeout = connection.exec_driver_sql(
+            "SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"
+        ).scalar()
+    assert int(statement_timeout) == settings.POSTGRES_STATEMENT_TIMEOUT_MS
+    assert engine.pool.size() == settings.POSTGRES_POOL_SIZE
+
+
+def test_pool_metrics():
+    count = engine.pool.metrics.get_histogram()["count"]
+    with engine.connect():
+        pass
+    status = get_pool_status(engine)
+    assert status["checkout_seconds"]["count"] == count + 1
+    assert status["checkout_seconds"]["buckets"]["+Inf"] == count + 1
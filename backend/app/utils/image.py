@@ -0,0 +1,35 @@
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+
+def preprocess_image(
+    content: bytes, max_edge: int, grayscale: bool, quality: int
+) -> bytes | None:
+    """
+    Fix the EXIF rotation of an image, downscale it and encode it as JPEG
+
+    :param content: the original file
+    :param max_edge: max size of the longest edge in pixels
+    :param grayscale: whether to drop the colors
+    :param quality: JPEG quality
+    :return: the compact image, or None if the file is not a decodable image
+    """
+    # Pixels are decoded lazily, truncated files only fail once resized
+    try:
+        image = ImageOps.exif_transpose(Image.open(BytesIO(content)))
+
+        # Keep the aspect ratio, never upscale
+        image.thumbnail((max_edge, max_edge))
+        image = image.convert("L" if grayscale else "RGB")
+
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+    except (OSError, Image.DecompressionBombError):
+        return None
+    return output.getvalue()
+
+
+def to_data_url(content: bytes, media_type: str = "image/jpeg") -> str:
+    return f"data:{media_type};base64,{base64.b64encode(content).decode()}"
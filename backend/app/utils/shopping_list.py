@@ -0,0 +1,323 @@
+import csv
+import heapq
+import math
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from io import StringIO
+from itertools import zip_longest
+from typing import Protocol
+
+from app.api.dashboard.model.offer import OfferPublic
+
+
+class ShoppingListOffer(Protocol):
+    id: uuid.UUID
+    store_id: uuid.UUID
+    price: float
+    ordinary_price: float
+    unit_range_from: int
+    unit_range_to: int
+
+
+@dataclass
+class ShoppingListSolution:
+    store_id: uuid.UUID | None = None
+    # (offer, quantity) pairs
+    items: list[tuple[ShoppingListOffer, int]] = field(default_factory=list)
+    total: float = 0.0
+    savings: float = 0.0
+    # The offers of the store considered by the solver
+    candidates: list[ShoppingListOffer] = field(default_factory=list)
+
+
+def get_savings(offer: ShoppingListOffer) -> float:
+    return max(offer.ordinary_price - offer.price, 0.0)
+
+
+def get_quantities(offer: ShoppingListOffer, max_quantity: int) -> range:
+    # The unit range bounds the quantity bought, 0 when not set
+    low = min(max(offer.unit_range_from, 1), max_quantity)
+    high = min(max(offer.unit_range_to, low), max_quantity)
+    return range(low, high + 1)
+
+
+def prune_candidates(
+    offers: list[ShoppingListOffer],
+    budget: float,
+    max_items: int,
+    max_candidates: int,
+) -> list[ShoppingListOffer]:
+    """
+    Keep the offers that may be part of the best list of a store
+
+    An offer is dropped when max_items other offers, which can be bought by
+    the unit, are as cheap and save as much. A list has at most max_items
+    units, so a list buying q units of the dropped offer leaves at least q of
+    these offers unused, and each unit can be replaced by one unit of a
+    different unused offer. Of the remaining offers, the ones with the
+    highest savings and savings per price are kept, up to max_candidates.
+    """
+    # Sort by id too, the same catalog always gives the same list
+    entries = sorted(
+        (offer.price, -get_savings(offer), offer.id, offer)
+        for offer in offers
+        if 0 < offer.price <= budget and offer.ordinary_price > offer.price
+    )
+
+    candidates = []
+    # Highest savings of the offers seen so far, which are as cheap
+    savings = []
+    for entry in entries:
+        price, negative_savings, _, offer = entry
+        if len(savings) < max_items or savings[0] < -negative_savings:
+            candidates.append(entry)
+        if offer.unit_range_from <= 1:
+            if len(savings) < max_items:
+                heapq.heappush(savings, -negative_savings)
+            else:
+                heapq.heappushpop(savings, -negative_savings)
+
+    if len(candidates) > max_candidates:
+        by_savings = sorted(candidates, key=lambda entry: (entry[1], entry[2]))
+        by_ratio = sorted(candidates, key=lambda entry: (entry[1] / entry[0], entry[2]))
+        kept = {}
+        for entry in (
+            by_savings[: max_candidates // 2] + by_ratio[: max_candidates // 2]
+        ):
+            kept[entry[2]] = entry
+        candidates = sorted(kept.values(), key=lambda entry: entry[:3])
+
+    return [entry[3] for entry in candidates]
+
+
+def get_upper_bound(
+    offers: list[ShoppingListOffer], budget: float, max_items: int, max_quantity: int
+) -> float:
+    """
+    The savings of a store can't exceed those of its best max_items units, nor
+    those of its best units per price filling the budget with a fraction
+    """
+    units = []
+    for offer in offers:
+        units += [offer] * (get_quantities(offer, max_quantity).stop - 1)
+
+    by_savings = sorted(units, key=get_savings, reverse=True)
+    items_bound = sum(get_savings(offer) for offer in by_savings[:max_items])
+
+    budget_bound = 0.0
+    remaining = budget
+    for offer in sorted(units, key=lambda offer: get_savings(offer) / offer.price)[
+        ::-1
+    ]:
+        if offer.price >= remaining:
+            budget_bound += get_savings(offer) * remaining / offer.price
+            break
+        budget_bound += get_savings(offer)
+        remaining -= offer.price
+
+    return min(items_bound, budget_bound)
+
+
+def solve_store(
+    offers: list[ShoppingListOffer],
+    budget: float,
+    max_items: int,
+    max_quantity: int,
+    cost_buckets: int,
+) -> ShoppingListSolution:
+    """
+    Bounded knapsack maximizing the savings of a single store
+
+    Costs are rounded up to 1/cost_buckets of the budget, so a solution never
+    exceeds it. best[k][c] is the best value of k units costing c buckets.
+    """
+    bucket = budget / cost_buckets
+    unset = -math.inf
+    best = [[0.0] * (cost_buckets + 1)] + [
+        [unset] * (cost_buckets + 1) for _ in range(max_items)
+    ]
+    layers = []
+    options = []
+    # Highest reachable count and cost so far
+    max_count = max_cost = 0
+    for offer in offers:
+        weight = math.ceil(offer.price / bucket - 1e-9)
+        # Prefer the cheapest list among the ones saving the same
+        value = get_savings(offer) - offer.price * 1e-6
+        quantities = [
+            (quantity, quantity * weight, quantity * value)
+            for quantity in get_quantities(offer, max_quantity)
+            if quantity * weight <= cost_buckets
+        ]
+        if not quantities:
+            continue
+
+        layer = [row[:] for row in best]
+        for quantity, weight_sum, value_sum in quantities:
+            end = min(max_cost + weight_sum, cost_buckets) + 1
+            for count in range(quantity, min(max_count + quantity, max_items) + 1):
+                previous = best[count - quantity]
+                current = layer[count]
+                current[weight_sum:end] = [
+                    a if a > b else b
+                    for a, b in zip(
+                        current[weight_sum:end], map(value_sum.__add__, previous)
+                    )
+                ]
+        max_count = min(max_count + quantities[-1][0], max_items)
+        max_cost = min(max_cost + quantities[-1][1], cost_buckets)
+        layers.append(best)
+        options.append((offer, quantities))
+        best = layer
+
+    # Pick the best state, then walk back through the layers
+    _, count, cost = max(
+        (row[c], k, c)
+        for k, row in enumerate(best)
+        for c in range(cost_buckets + 1)
+        if row[c] != unset
+    )
+    solution = ShoppingListSolution(candidates=offers)
+    for (offer, quantities), previous in zip(reversed(options), reversed(layers)):
+        if previous[count][cost] == best[count][cost]:
+            best = previous
+            continue
+        for quantity, weight_sum, value_sum in quantities:
+            if (
+                count >= quantity
+                and cost >= weight_sum
+                and previous[count - quantity][cost - weight_sum] + value_sum
+                == best[count][cost]
+            ):
+                solution.items.append((offer, quantity))
+                count, cost = count - quantity, cost - weight_sum
+                break
+        best = previous
+
+    solution.items.reverse()
+    solution.total = sum(offer.price * quantity for offer, quantity in solution.items)
+    solution.savings = sum(
+        get_savings(offer) * quantity for offer, quantity in solution.items
+    )
+    return solution
+
+
+def solve_shopping_list(
+    offers: list[ShoppingListOffer],
+    budget: float,
+    max_items: int = 15,
+    max_quantity: int = 3,
+    cost_buckets: int = 200,
+    max_candidates: int = 30,
+) -> ShoppingListSolution:
+    """
+    Choose the offers of a single store saving the most within the budget
+
+    :param offers: the offers of all stores
+    :param budget: the max total price
+    :param max_items: the max number of units in the list
+    :param max_quantity: the max number of units of an offer
+    :param cost_buckets: the precision of the costs, a fraction of the budget
+    :param max_candidates: the max number of offers of a store considered
+    :return: the best list, empty if nothing fits in the budget
+    """
+    if budget <= 0:
+        return ShoppingListSolution()
+
+    offers_by_store = defaultdict(list)
+    for offer in offers:
+        offers_by_store[offer.store_id].append(offer)
+
+    stores = []
+    for store_id, store_offers in offers_by_store.items():
+        candidates = prune_candidates(store_offers, budget, max_items, max_candidates)
+        bound = get_upper_bound(candidates, budget, max_items, max_quantity)
+        stores.append((bound, str(store_id), store_id, candidates))
+    stores.sort(key=lambda store: (-store[0], store[1]))
+
+    solution = ShoppingListSolution()
+    # Skip the stores which can't beat the best list found so far
+    for bound, _, store_id, candidates in stores:
+        if bound <= solution.savings:
+            break
+        store_solution = solve_store(
+            candidates, budget, max_items, max_quantity, cost_buckets
+        )
+        if store_solution.savings > solution.savings:
+            solution = store_solution
+            solution.store_id = store_id
+    return solution
+
+
+def select_prompt_offers(
+    offers: list[OfferPublic], max_offers: int
+) -> list[OfferPublic]:
+    """
+    Keep the offers with the highest discount ratio of every category
+
+    Categories are taken in turn, so a few heavily discounted categories
+    can't fill the whole selection.
+
+    :param offers:
+    :param max_offers:
+    :return: at most max_offers offers
+    """
+    offers_by_category = defaultdict(list)
+    for offer in offers:
+        if offer.price > 0 and offer.ordinary_price > 0:
+            offers_by_category[offer.category].append(offer)
+
+    rankings = []
+    for category_offers in offers_by_category.values():
+        category_offers.sort(
+            key=lambda offer: (-get_savings(offer) / offer.ordinary_price, offer.id)
+        )
+        rankings.append(category_offers)
+    # The categories with the best discounts go first in every turn
+    rankings.sort(
+        key=lambda ranking: (
+            -get_savings(ranking[0]) / ranking[0].ordinary_price,
+            ranking[0].category,
+        )
+    )
+
+    selected_offers = []
+    for turn in zip_longest(*rankings):
+        selected_offers += [offer for offer in turn if offer is not None]
+        if len(selected_offers) >= max_offers:
+            break
+    return selected_offers[:max_offers]
+
+
+def encode_prompt_offers(offers: list[OfferPublic]) -> str:
+    """
+    Encode the offers as CSV rows, identified by their index in the list
+
+    :param offers:
+    :return:
+    """
+    output = StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(
+        ["id", "name", "category", "price", "ordinary_price", "unit", "range", "store"]
+    )
+    for handle, offer in enumerate(offers):
+        unit_range = (
+            f"{offer.unit_range_from}-{offer.unit_range_to}"
+            if offer.unit_range_to
+            else ""
+        )
+        writer.writerow(
+            [
+                handle,
+                offer.item_en,
+                offer.category,
+                f"{offer.price:g}",
+                f"{offer.ordinary_price:g}",
+                offer.unit,
+                unit_range,
+                offer.store_name,
+            ]
+        )
+    return output.getvalue()
@@ -0,0 +1,5 @@
+#! /usr/bin/env bash
+set -e
+
+# Sends the periodic tasks to the workers, a single instance must run
+celery -A app.core.celery beat -l info --schedule /tmp/celerybeat-schedule
@@ -0,0 +1,98 @@
+"""
+Benchmark the read routes under concurrent clients
+
+Signs in, then runs concurrent clients requesting the given paths in a loop
+against a running server, and reports the requests/sec and latencies of each
+path. Start the server with a single worker to get the numbers per worker:
+
+    uvicorn app.main:app --workers 1 --port 8000
+
+Usage:
+    python scripts/benchmark_async_routes.py [--url http://localhost:8000]
+        [--email admin@example.com] [--password changethis]
+        [--clients 50] [--duration 10] [--paths /receipts/list ...]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.core.config import settings
+
+PATHS = [
+    "/receipts/list",
+    "/receipts/list/cursor",
+    "/budgets/list",
+    "/budgets/current",
+    "/budgets/overview",
+    "/offers/list",
+]
+
+
+async def sign_in(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post(
+        "/auth/sign-in-for-swagger", data={"username": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_client(
+    client: httpx.AsyncClient, path: str, deadline: float, latencies: list[float]
+) -> int:
+    errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors += 1
+    return errors
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(
+        base_url=args.url + settings.API_V1_STR, limits=limits, timeout=60
+    ) as client:
+        token = await sign_in(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        print(f"{args.clients} clients, {args.duration}s per path")
+        print(f"{'path':<24} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for path in args.paths:
+            latencies: list[float] = []
+            start = time.perf_counter()
+            deadline = start + args.duration
+            errors = await asyncio.gather(
+                *(
+                    run_client(client, path, deadline, latencies)
+                    for _ in range(args.clients)
+                )
+            )
+            elapsed = time.perf_counter() - start
+            percentiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{path:<24} {len(latencies) / elapsed:>8.0f}"
+                f" {percentiles[49] * 1000:>8.1f} {percentiles[98] * 1000:>8.1f}"
+                f" {sum(errors):>7}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default=settings.FIRST_SUPERUSER)
+    parser.add_argument("--password", default=settings.FIRST_SUPERUSER_PASSWORD)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--paths", nargs="+", default=PATHS)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
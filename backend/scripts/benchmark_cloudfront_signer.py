@@ -0,0 +1,87 @@
+"""
+Benchmark the signing of CloudFront URLs
+
+Signs the URLs of a simulated offers page with a throwaway RSA key, and reports
+the URLs/sec of:
+    - parsing the key for every signature (previous behaviour)
+    - the key parsed once per process
+    - the key parsed once and the signed URLs cached per file name
+
+Usage:
+    python scripts/benchmark_cloudfront_signer.py [--pages 20] [--page-size 50]
+"""
+
+import argparse
+import base64
+import time
+from datetime import datetime, timedelta
+
+from botocore.signers import CloudFrontSigner
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from app.core import cloudfront
+from app.core.config import settings
+
+
+def generate_private_key_string() -> str:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    return base64.b64encode(pem).decode()
+
+
+def parse_and_sign(message: bytes) -> bytes:
+    private_key = serialization.load_pem_private_key(
+        base64.b64decode(settings.CLOUDFRONT_PRIVATE_KEY_STRING), password=None
+    )
+    return private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+
+
+def run(label: str, generate_url, file_names: list[str], pages: int) -> float:
+    start = time.perf_counter()
+    for _ in range(pages):
+        for file_name in file_names:
+            generate_url(file_name)
+    elapsed = time.perf_counter() - start
+    rate = pages * len(file_names) / elapsed
+    print(f"{label:<22} {rate:>12.0f} urls/s {elapsed * 1000:>10.1f} ms")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    settings.CLOUDFRONT_PRIVATE_KEY_STRING = generate_private_key_string()
+    file_names = [f"offers/{i}.jpg" for i in range(args.page_size)]
+
+    signer = CloudFrontSigner(settings.CLOUDFRONT_KEY_ID, parse_and_sign)
+
+    def generate_url_parsing_key(file_name: str) -> str:
+        url = settings.CLOUDFRONT_DISTRIBUTION_DOMAIN + "/" + file_name
+        expire_at = datetime.now() + timedelta(hours=1)
+        return signer.generate_presigned_url(url, date_less_than=expire_at)
+
+    client = cloudfront.CloudFrontClient()
+
+    def generate_url_preloaded_key(file_name: str) -> str:
+        client.url_cache.clear()
+        return client.generate_url(file_name)
+
+    print(f"{args.pages} pages of {args.page_size} offers")
+    before = run(
+        "key parsed every time", generate_url_parsing_key, file_names, args.pages
+    )
+    run("key parsed once", generate_url_preloaded_key, file_names, args.pages)
+    after = run("key parsed once, cache", client.generate_url, file_names, args.pages)
+    print(f"speedup: {after / before:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark RedisClient.delete_prefix
+
+Fills the configured Redis with --keys keys under a benchmark prefix, of which
+--matching share the prefix being deleted, then times the previous
+implementation (SCAN everything, then DEL the keys one by one) and
+delete_prefix. The previous implementation needs a SCAN call per 10 keys of
+the whole keyspace, skip it with --no-baseline on slow stand-ins. Run it
+against a throwaway Redis, e.g. the redis service of docker-compose, its keys
+are removed at the end.
+
+Usage:
+    python scripts/benchmark_delete_prefix.py [--keys 1000000]
+        [--matching 10000] [--count 1000] [--no-baseline]
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.core.db_redis import RedisClient
+
+PREFIX = "benchmark:delete_prefix:"
+BATCH_SIZE = 10000
+
+
+async def fill(client: RedisClient, prefix: str, size: int) -> None:
+    for start in range(0, size, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, size)
+        await client.mset({f"{prefix}{i}": 1 for i in range(start, stop)})
+
+
+async def delete_one_by_one(client: RedisClient, prefix: str) -> int:
+    keys = []
+    async for key in client.scan_iter(match=f"{prefix}*"):
+        keys.append(key)
+    for key in keys:
+        await client.delete(key)
+    return len(keys)
+
+
+async def run(args: argparse.Namespace) -> None:
+    client = RedisClient()
+    target = f"{PREFIX}target:"
+
+    start = time.perf_counter()
+    await fill(client, f"{PREFIX}other:", args.keys - args.matching)
+    await fill(client, target, args.matching)
+    print(f"filled {args.keys} keys in {time.perf_counter() - start:.1f}s")
+
+    try:
+        print(f"{'implementation':<24} {'removed':>8} {'seconds':>8}")
+        implementations = [
+            ("scan then delete", lambda: delete_one_by_one(client, target)),
+            (
+                f"delete_prefix({args.count})",
+                lambda: client.delete_prefix(target, count=args.count),
+            ),
+        ]
+        if not args.baseline:
+            implementations = implementations[1:]
+        for name, delete in implementations:
+            await fill(client, target, args.matching)
+            start = time.perf_counter()
+            removed = await delete()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<24} {removed:>8} {elapsed:>8.2f}")
+    finally:
+        await client.delete_prefix(PREFIX, count=BATCH_SIZE)
+        await client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--matching", type=int, default=10_000)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument(
+        "--no-baseline", dest="baseline", action="store_false", default=True
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
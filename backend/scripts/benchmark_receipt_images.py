@@ -0,0 +1,126 @@
+"""
+Benchmark the preprocessing of receipt photos before the extraction
+
+Reports, for every image of a sample directory, the bytes and the estimated
+OpenAI image tokens of the original file and of the compact version, along
+with the time spent preprocessing. With --extract, the extraction is also
+run on both versions to compare the OpenAI latency (needs OPENAI_KEY).
+
+Usage:
+    python scripts/benchmark_receipt_images.py <images dir> [--extract]
+        [--max-edge 2048] [--quality 80] [--color]
+"""
+
+import argparse
+import math
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from app.utils.image import preprocess_image, to_data_url
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def estimate_image_tokens(content: bytes) -> int:
+    # High detail cost of gpt-4o-mini images: the image is fit in 2048x2048,
+    # its shortest side scaled to 768, then billed per 512px tile
+    width, height = ImageOps.exif_transpose(Image.open(BytesIO(content))).size
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def extract(image_url: str) -> float:
+    from app.core.openai import openai_client
+
+    start = time.perf_counter()
+    openai_client.gpt_4o_analyse_image_with_completion(image_url)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--extract", action="store_true")
+    parser.add_argument("--max-edge", type=int, default=2048)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--color", action="store_true")
+    args = parser.parse_args()
+
+    files = sorted(
+        path
+        for path in args.directory.iterdir()
+        if path.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not files:
+        raise SystemExit(f"No images found in {args.directory}")
+
+    totals = {"bytes": [0, 0], "tokens": [0, 0], "extract": [0.0, 0.0]}
+    total_preprocess = 0.0
+
+    print(
+        f"{'file':<30} {'bytes':>10} {'compact':>10} {'tokens':>7} {'compact':>7}"
+        f" {'prep ms':>8}" + (f" {'llm s':>7} {'compact':>7}" if args.extract else "")
+    )
+    for path in files:
+        content = path.read_bytes()
+
+        start = time.perf_counter()
+        compact = preprocess_image(
+            content,
+            max_edge=args.max_edge,
+            grayscale=not args.color,
+            quality=args.quality,
+        )
+        preprocess_time = time.perf_counter() - start
+        if compact is None:
+            print(f"{path.name:<30} not an image, skipped")
+            continue
+
+        sizes = [len(content), len(compact)]
+        tokens = [estimate_image_tokens(content), estimate_image_tokens(compact)]
+        line = (
+            f"{path.name[:30]:<30} {sizes[0]:>10} {sizes[1]:>10}"
+            f" {tokens[0]:>7} {tokens[1]:>7} {preprocess_time * 1000:>8.1f}"
+        )
+
+        if args.extract:
+            media_type = Image.MIME.get(Image.open(BytesIO(content)).format)
+            latencies = [
+                extract(to_data_url(content, media_type=media_type)),
+                extract(to_data_url(compact)),
+            ]
+            line += f" {latencies[0]:>7.2f} {latencies[1]:>7.2f}"
+            for i in range(2):
+                totals["extract"][i] += latencies[i]
+
+        for i in range(2):
+            totals["bytes"][i] += sizes[i]
+            totals["tokens"][i] += tokens[i]
+        total_preprocess += preprocess_time
+        print(line)
+
+    print()
+    print(
+        f"bytes:  {totals['bytes'][0]} -> {totals['bytes'][1]}"
+        f" ({totals['bytes'][1] / totals['bytes'][0]:.1%})"
+    )
+    print(
+        f"tokens: {totals['tokens'][0]} -> {totals['tokens'][1]}"
+        f" ({totals['tokens'][1] / totals['tokens'][0]:.1%})"
+    )
+    print(f"preprocessing: {total_preprocess * 1000:.1f} ms in total")
+    if args.extract:
+        print(
+            f"extraction: {totals['extract'][0]:.2f} s -> {totals['extract'][1]:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
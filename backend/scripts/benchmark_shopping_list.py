@@ -0,0 +1,116 @@
+"""
+Benchmark the shopping list recommendation
+
+Generates synthetic offer catalogs and reports, for each size, the latency of
+the local solver and the total and savings of its list. With --llm, the list
+is also generated by OpenAI over the whole catalog (needs OPENAI_KEY), only
+for the catalogs small enough to fit in its context.
+
+Usage:
+    python scripts/benchmark_shopping_list.py [--sizes 1000 10000 50000]
+        [--budget 500] [--stores 10] [--llm]
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from app.api.dashboard.model.offer import OfferPublic
+from app.core.config import settings
+from app.utils.shopping_list import solve_shopping_list
+
+CATEGORIES = ["dairy", "meat", "fish", "vegetables", "fruit", "bread", "snacks"]
+# Rough number of offers fitting in the context of gpt-4o-mini
+LLM_MAX_OFFERS = 1000
+
+
+def generate_offers(size: int, stores: int, seed: int) -> list[OfferPublic]:
+    rng = random.Random(seed)
+    store_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(stores)]
+    offers = []
+    for i in range(size):
+        ordinary_price = round(rng.uniform(5, 150), 2)
+        price = round(ordinary_price * rng.uniform(0.5, 1.0), 2)
+        unit_range_from = rng.choice([0, 0, 1, 2])
+        offers.append(
+            OfferPublic(
+                id=uuid.UUID(int=rng.getrandbits(128)),
+                store_id=rng.choice(store_ids),
+                store_name=f"store {i % stores}",
+                category=rng.choice(CATEGORIES),
+                item=f"item {i}",
+                item_en=f"item {i}",
+                item_sv=f"vara {i}",
+                item_zh=f"item {i}",
+                unit="st",
+                img=f"offers/{i}.jpg",
+                price=price,
+                ordinary_price=ordinary_price,
+                unit_range_from=unit_range_from,
+                unit_range_to=rng.choice([0, unit_range_from, 3]),
+            )
+        )
+    return offers
+
+
+def summarize(
+    selected_offers: list[tuple[OfferPublic, int]],
+) -> tuple[int, float, float]:
+    units = sum(quantity for _, quantity in selected_offers)
+    total = sum(offer.price * quantity for offer, quantity in selected_offers)
+    savings = sum(
+        (offer.ordinary_price - offer.price) * quantity
+        for offer, quantity in selected_offers
+    )
+    return units, total, savings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000]
+    )
+    parser.add_argument("--budget", type=float, default=500)
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    if args.llm:
+        from app.api.dashboard.service.offer_service import offer_service
+
+    print(
+        f"{'offers':>7} {'solver':>7} {'ms':>10} {'units':>6} {'total':>9} {'savings':>9}"
+    )
+    for size in args.sizes:
+        offers = generate_offers(size, args.stores, seed=size)
+
+        start = time.perf_counter()
+        solution = solve_shopping_list(
+            offers,
+            budget=args.budget,
+            max_items=settings.SHOPPING_LIST_MAX_ITEMS,
+            max_quantity=settings.SHOPPING_LIST_MAX_QUANTITY,
+        )
+        elapsed = time.perf_counter() - start
+        units, total, savings = summarize(solution.items)
+        print(
+            f"{size:>7} {'local':>7} {elapsed * 1000:>10.1f}"
+            f" {units:>6} {total:>9.2f} {savings:>9.2f}"
+        )
+
+        if args.llm and size <= LLM_MAX_OFFERS:
+            start = time.perf_counter()
+            selected_offers = offer_service.generate_shopping_list(
+                offers, str(args.budget)
+            )
+            elapsed = time.perf_counter() - start
+            units, total, savings = summarize(selected_offers or [])
+            print(
+                f"{size:>7} {'llm':>7} {elapsed * 1000:>10.1f}"
+                f" {units:>6} {total:>9.2f} {savings:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
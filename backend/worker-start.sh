@@ -3,4 +3,6 @@ set -e
 
 python /app/app/celeryworker_pre_start.py
 
-celery -A app.core.celery worker -l info -Q main-queue -c 1 --loglevel=debug
+# Receipt tasks mostly wait on OpenAI, each file is a task and the files of an
+# upload are extracted in parallel by the worker threads
+celery -A app.core.celery worker -l info -Q main-queue --pool threads -c ${CELERY_WORKER_CONCURRENCY:-8} --loglevel=debug